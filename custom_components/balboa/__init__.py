@@ -1,32 +1,110 @@
 """The Balboa Spa Client integration."""
 import asyncio
+import json
+import os
 import time
+from collections import namedtuple
 from typing import Any, Dict
 
 import homeassistant.helpers.config_validation as cv
 import homeassistant.util.dt as dt_util
 import voluptuous as vol
 from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
-from homeassistant.const import CONF_HOST, CONF_NAME
+from homeassistant.const import ATTR_ENTITY_ID, CONF_HOST, CONF_NAME
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import device_registry
 from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC
 from homeassistant.helpers.dispatcher import (
     async_dispatcher_connect,
     async_dispatcher_send,
 )
 from homeassistant.helpers.entity import Entity
-from pybalboa import BalboaSpaWifi
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.helpers.service import async_register_admin_service
+from homeassistant.helpers.storage import Store
+from pybalboa import balboa
 
 from .const import (
     _LOGGER,
+    COMMAND_FLUSH_WINDOW,
+    COMMANDS,
+    CONFIG_PAGES_TIMEOUT,
+    CONFIG_ENTITY_KEYS,
+    CONNECTION_CHECK_INTERVAL,
+    CONF_DIAGNOSTICS,
+    CONF_OPTIMISTIC_WINDOW,
+    CONF_PROFILE,
+    CONF_PUBLISH_INTERVAL,
+    CONF_RECORD_FRAMES,
     CONF_SYNC_TIME,
+    CONF_TEMPERATURE_WINDOWS,
+    DEFAULT_DIAGNOSTICS,
+    DEFAULT_OPTIMISTIC_WINDOW,
+    DEFAULT_PROFILE,
+    DEFAULT_PROFILE_FILENAME,
+    DEFAULT_PUBLISH_INTERVAL,
+    DEFAULT_RECORD_FRAMES,
     DEFAULT_SYNC_TIME,
+    DEFAULT_TEMPERATURE_WINDOWS,
+    DIAGNOSTICS,
+    DISPATCHES,
     DOMAIN,
+    EVENT_CHANGE,
+    EVENT_STARTUP,
+    HEATING_STORAGE_KEY,
+    PHASE_CONFIGURED,
+    PHASE_CONNECT,
+    PHASE_FIRST_STATE,
+    PHASE_IDENT,
+    PHASE_PLATFORMS,
     PLATFORMS,
+    PROBES,
+    PROFILER,
+    RECORDER_FILENAME,
+    RECORDER_SIZE,
+    SCENE_CHANGES,
+    SCENES,
+    SERVICE_APPLY_SCENE,
+    SERVICE_DUMP_PROFILE,
+    SETUP_START,
+    SIGNAL_CONFIG,
+    SIGNAL_UPDATE,
     SPA,
+    STATUS,
+    STATUS_AUX,
+    STATUS_BLOWER,
+    STATUS_CIRC_PUMP,
+    STATUS_CONNECTED,
+    STATUS_CURTEMP,
+    STATUS_FILTER_MODE,
+    STATUS_HEATMODE,
+    STATUS_HEATSTATE,
+    STATUS_LIGHT,
+    STATUS_MISTER,
+    STATUS_PUMP,
+    STATUS_SETTEMP,
+    STATUS_TEMPRANGE,
+    STATUS_TEMPSCALE,
+    STATUS_TIME,
+    STARTUP_PHASES,
+    STORAGE_KEY,
+    STORAGE_VERSION,
+    SUPERVISOR,
+    TEMPERATURE_WINDOWS,
+    THROTTLED_STATUS_FIELDS,
+    TIME_SYNC_RETRY,
+    TIME_SYNC_THRESHOLD,
+    TIME_SYNCED,
+    TIMINGS,
     UNSUB,
 )
+from .client import CONFIG_PAGES, QUERY_REQUESTS, BalboaSpaClient
+from .commands import CommandQueue
+from .profiler import CountingStatus, Profiler
+from .recorder import FrameRecorder
+from .scenes import APPLY_SCENE_SCHEMA, async_apply_scene, async_scene_entries
+from .supervisor import SpaSupervisor
 
 BALBOA_CONFIG_SCHEMA = vol.Schema(
     {vol.Required(CONF_HOST): cv.string, vol.Required(CONF_NAME): cv.string}
@@ -37,6 +115,23 @@ CONFIG_SCHEMA = vol.Schema(
 )
 
 
+def _file_name(value):
+    """Validate a bare file name, which cannot point outside its directory."""
+    value = cv.string(value)
+    if (
+        value in ("", ".", "..")
+        or value != os.path.basename(value)
+        or any(sep in value for sep in ("/", "\\"))
+    ):
+        raise vol.Invalid("must be a file name without a directory")
+    return value
+
+
+DUMP_PROFILE_SCHEMA = vol.Schema(
+    {vol.Optional("filename", default=DEFAULT_PROFILE_FILENAME): _file_name}
+)
+
+
 async def async_setup(hass: HomeAssistant, config: dict):
     """Configure the Balboa Spa Client component using flow only."""
     hass.data[DOMAIN] = {}
@@ -48,46 +143,181 @@ async def async_setup(hass: HomeAssistant, config: dict):
                     DOMAIN, context={"source": SOURCE_IMPORT}, data=entry
                 )
             )
+
+    async def async_dump_profile(call):
+        """Write the profiles of all spas to a JSON file in the config dir."""
+        profiles = {
+            entry_id: entry_data[PROFILER].as_dict()
+            for entry_id, entry_data in hass.data[DOMAIN].items()
+        }
+        path = hass.config.path(call.data["filename"])
+        await hass.async_add_executor_job(_write_json, path, profiles)
+        _LOGGER.info("Wrote Balboa profile to %s", path)
+
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_DUMP_PROFILE,
+        async_dump_profile,
+        schema=DUMP_PROFILE_SCHEMA,
+    )
+
+    async def async_handle_apply_scene(call):
+        """Bring the targeted spas, or all of them, to a scene."""
+        scene = dict(call.data)
+        entry_ids = await async_scene_entries(hass, scene.pop(ATTR_ENTITY_ID, None))
+        await asyncio.gather(
+            *(async_apply_scene(hass, entry_id, scene) for entry_id in entry_ids)
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_APPLY_SCENE,
+        async_handle_apply_scene,
+        schema=APPLY_SCENE_SCHEMA,
+    )
+
+    # One timer checks every spa's connection, so the number of timers does
+    # not grow with the number of spas.
+    @callback
+    def _async_check_connections(_now):
+        """Check the connection of every spa."""
+        for entry_data in hass.data[DOMAIN].values():
+            entry_data[SUPERVISOR].async_check()
+
+    async_track_time_interval(hass, _async_check_connections, CONNECTION_CHECK_INTERVAL)
     return True
 
 
+def _write_json(path, data):
+    """Write data to path as JSON."""
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up Balboa Spa from a config entry."""
     host = entry.data[CONF_HOST]
 
     unsub = entry.add_update_listener(update_listener)
 
-    _LOGGER.info("Attempting to connect to %s", host)
-    spa = BalboaSpaWifi(host)
-    hass.data[DOMAIN][entry.entry_id] = {SPA: spa, UNSUB: unsub}
-
-    connected = await spa.connect()
-    if not connected:
-        _LOGGER.error("Failed to connect to spa at %s", host)
-        raise ConfigEntryNotReady
-
-    # send config requests, and then listen until we are configured.
-    await spa.send_mod_ident_req()
-    await spa.send_panel_req(0, 1)
-    # configured = await spa.listen_until_configured()
+    # The config flow leaves its connection to a new spa open for us
+    spa = hass.data.get(PROBES, {}).pop(host, None)
+    if spa is None or not spa.connected:
+        spa = BalboaSpaClient(host)
+    commands = CommandQueue(hass, spa)
+    supervisor = SpaSupervisor(hass, spa, commands)
+    hass.data[DOMAIN][entry.entry_id] = entry_data = {
+        SPA: spa,
+        COMMANDS: commands,
+        SUPERVISOR: supervisor,
+        UNSUB: unsub,
+        DIAGNOSTICS: entry.options.get(CONF_DIAGNOSTICS, DEFAULT_DIAGNOSTICS),
+        TEMPERATURE_WINDOWS: entry.options.get(
+            CONF_TEMPERATURE_WINDOWS, DEFAULT_TEMPERATURE_WINDOWS
+        ),
+        DISPATCHES: 0,
+        SCENES: 0,
+        SCENE_CHANGES: set(),
+        PROFILER: Profiler(),
+        SETUP_START: time.monotonic(),
+        TIMINGS: {},
+        TIME_SYNCED: None,
+    }
+
+    store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(entry.entry_id))
+    cached_config = await store.async_load()
+
+    if cached_config is None and spa.connected:
+        _LOGGER.info("Using the identified connection to %s", host)
+        _async_mark_phase(hass, entry, PHASE_CONNECT)
+        _async_mark_phase(hass, entry, PHASE_IDENT)
+        _async_mark_phase(hass, entry, PHASE_CONFIGURED)
+        supervisor.start()
+        # The probe read every configuration page, so this returns at once
+        await _async_save_config(hass, entry, spa, store, None)
+    elif cached_config is None:
+        _LOGGER.info("Attempting to connect to %s", host)
+        connected = await spa.connect()
+        if not connected:
+            _LOGGER.error("Failed to connect to spa at %s", host)
+            # Leave nothing for the shared connection check to supervise;
+            # the retry sets the entry up from scratch
+            hass.data[DOMAIN].pop(entry.entry_id)
+            await supervisor.async_stop()
+            unsub()
+            raise ConfigEntryNotReady
+        _async_mark_phase(hass, entry, PHASE_CONNECT)
+
+        _LOGGER.info("Starting listener and monitor tasks.")
+        supervisor.start()
+        await _async_configure(hass, entry, spa)
+        config, complete = await _async_save_config(hass, entry, spa, store, None)
+        if not complete:
+            supervisor.start_task(
+                "reconcile", _async_save_config(hass, entry, spa, store, config, None)
+            )
+    else:
+        # Set up from the last known configuration right away; the connection
+        # monitor connects in the background and the live configuration is
+        # compared with the cached one once it arrives.
+        _LOGGER.info("Using cached configuration for spa at %s", host)
+        _apply_spa_config(spa, cached_config)
+        supervisor.start()
+        supervisor.start_task(
+            "reconcile", _async_reconcile_config(hass, entry, spa, store, cached_config)
+        )
+    entry_data[STATUS] = SpaStatus.from_spa(spa)
+    commands.async_status_updated(entry_data[STATUS])
 
-    _LOGGER.info("Starting listener and monitor tasks.")
-    hass.loop.create_task(spa.listen())
-    await spa.spa_configured()
-    hass.loop.create_task(spa.check_connection_status())
+    signal = SIGNAL_UPDATE.format(entry.entry_id)
 
-    # At this point we have a configured spa.
-    forward_setup = hass.config_entries.async_forward_entry_setup
-    for component in PLATFORMS:
-        hass.async_create_task(forward_setup(entry, component))
+    profiler = entry_data[PROFILER]
 
     async def _async_balboa_update_cb():
         """Primary update callback called from pybalboa."""
-        _LOGGER.debug("Primary update callback triggered")
-        async_dispatcher_send(hass, DOMAIN)
+        start = time.perf_counter()
+        status = SpaStatus.from_spa(spa)
+        previous = entry_data[STATUS]
+        changed = status.changed_fields(previous)
+        if not changed:
+            return
+        entry_data[STATUS] = status
+        hass.bus.async_fire(
+            EVENT_CHANGE,
+            {
+                "entry_id": entry.entry_id,
+                **status.field_values(changed),
+                "previous": previous.field_values(changed),
+            },
+        )
+        commands.async_status_updated(status)
+        _LOGGER.debug("Spa status changed: %s", changed)
+        held = entry_data[SCENE_CHANGES]
+        if entry_data[SCENES] and STATUS_CONNECTED not in changed:
+            # A scene is being applied; its entities publish once it is done
+            held.update(changed)
+        else:
+            if held:
+                changed |= held
+                held.clear()
+            entry_data[DISPATCHES] += 1
+            async_dispatcher_send(hass, signal, status, changed)
+        if profiler.enabled:
+            profiler.record_frame(time.perf_counter() - start, changed)
+        if STATUS_TIME in changed and entry.options.get(
+            CONF_SYNC_TIME, DEFAULT_SYNC_TIME
+        ):
+            _async_sync_time(hass, entry, status)
+        if PHASE_PLATFORMS in entry_data[TIMINGS]:
+            _async_mark_phase(hass, entry, PHASE_FIRST_STATE)
 
     spa.new_data_cb = _async_balboa_update_cb
 
+    # Entities are created from the known configuration and status, so they
+    # are added without an initial update.
+    hass.async_create_task(_async_setup_platforms(hass, entry))
+
     # call update_listener on startup
     await update_listener(hass, entry)
 
@@ -98,8 +328,13 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
 
     _LOGGER.info("Disconnecting from spa")
-    spa = hass.data[DOMAIN][entry.entry_id][SPA]
-    await spa.disconnect()
+    # Taken out first so the shared connection check stops reconnecting
+    entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+    spa = entry_data[SPA]
+    await entry_data[SUPERVISOR].async_stop()
+    if spa.writer is not None:
+        await spa.disconnect()
+    await _async_set_recording(hass, entry, entry_data, False)
 
     unload_ok = all(
         await asyncio.gather(
@@ -110,29 +345,376 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
         )
     )
 
-    hass.data[DOMAIN][entry.entry_id][UNSUB]()
-
-    if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+    entry_data[UNSUB]()
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Remove the stored data and frame recording of a deleted entry."""
+    for key in (STORAGE_KEY, HEATING_STORAGE_KEY):
+        store = Store(hass, STORAGE_VERSION, key.format(entry.entry_id))
+        await store.async_remove()
+    path = hass.config.path(RECORDER_FILENAME.format(entry.entry_id))
+    await hass.async_add_executor_job(_remove_file, path)
+
+
+def _remove_file(path):
+    """Remove path if it exists."""
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _spa_config(spa):
+    """Return the spa configuration to cache between restarts."""
+    return {
+        "pump_array": list(spa.pump_array),
+        "light_array": list(spa.light_array),
+        "aux_array": list(spa.aux_array),
+        "blower": spa.blower,
+        "mister": spa.mister,
+        "circ_pump": spa.circ_pump,
+        "macaddr": spa.macaddr,
+        "model_name": spa.model_name,
+        "ssid": spa.ssid,
+        "tmin": [list(trange) for trange in spa.tmin],
+        "tmax": [list(trange) for trange in spa.tmax],
+    }
+
+
+def _apply_spa_config(spa, config):
+    """Load a cached configuration into the spa client."""
+    spa.pump_array[:] = config["pump_array"]
+    spa.light_array[:] = config["light_array"]
+    spa.aux_array[:] = config["aux_array"]
+    spa.blower = config["blower"]
+    spa.mister = config["mister"]
+    spa.circ_pump = config["circ_pump"]
+    spa.macaddr = config["macaddr"]
+    spa.model_name = config["model_name"]
+    spa.ssid = config["ssid"]
+    spa.tmin[:] = config["tmin"]
+    spa.tmax[:] = config["tmax"]
+
+
+async def _async_configure(hass, entry, spa):
+    """Request the spa's configuration and wait until it has arrived.
+
+    The requests are queried again while waiting, which only sends those
+    that went unanswered for QUERY_TIMEOUT.
+    """
+    commands = hass.data[DOMAIN][entry.entry_id][COMMANDS]
+    while spa.idigi_device_id == "Unknown":
+        _async_query_config(commands)
+        await asyncio.sleep(0.05)
+    _async_mark_phase(hass, entry, PHASE_IDENT)
+    while not (
+        spa.connected
+        and spa.config_loaded
+        and spa.macaddr != "Unknown"
+        and spa.curtemp != 0.0
+    ):
+        _async_query_config(commands)
+        await asyncio.sleep(0.05)
+    _async_mark_phase(hass, entry, PHASE_CONFIGURED)
+
+
+@callback
+def _async_query_config(commands):
+    """Query every configuration page of the spa not known yet."""
+    for mtype in QUERY_REQUESTS:
+        commands.async_query(mtype)
+
+
+async def _async_setup_platforms(hass, entry):
+    """Forward the entry to its platforms and time when they are all set up.
+
+    This runs as its own task: the platforms wait for the setup of the
+    integration, which must not wait for them in turn.
+    """
+    forward_setup = hass.config_entries.async_forward_entry_setup
+    await asyncio.gather(*(forward_setup(entry, component) for component in PLATFORMS))
+    _async_mark_phase(hass, entry, PHASE_PLATFORMS)
+
+
+@callback
+def _async_mark_phase(hass, entry, phase):
+    """Record how long after setup started a startup phase completed.
+
+    Once every phase has completed, the timings are logged and fired as a
+    balboa_startup event.  Nothing is recorded once the entry is unloaded.
+    """
+    entry_data = hass.data[DOMAIN].get(entry.entry_id)
+    if entry_data is None:
+        return
+    timings = entry_data[TIMINGS]
+    if phase in timings:
+        return
+    timings[phase] = round(time.monotonic() - entry_data[SETUP_START], 3)
+    if len(timings) < len(STARTUP_PHASES):
+        return
+    _LOGGER.info(
+        "Startup of %s took %s (seconds since setup started)",
+        entry.title,
+        ", ".join(f"{phase} {timings[phase]}" for phase in STARTUP_PHASES),
+    )
+    hass.bus.async_fire(EVENT_STARTUP, {"entry_id": entry.entry_id, **timings})
+
+
+async def _async_reconcile_config(hass, entry, spa, store, cached_config):
+    """Compare the live spa configuration with the cached one.
+
+    The cache is updated when anything changed, and the entry is reloaded to
+    add or remove entities if the spa's equipment or MAC address changed.
+    """
+    while not spa.connected:
+        await asyncio.sleep(1)
+    _async_mark_phase(hass, entry, PHASE_CONNECT)
+    await _async_configure(hass, entry, spa)
+    config, complete = await _async_save_config(hass, entry, spa, store, cached_config)
+    if not complete:
+        await _async_save_config(hass, entry, spa, store, config, None)
+
+
+async def _async_save_config(
+    hass, entry, spa, store, cached_config, timeout=CONFIG_PAGES_TIMEOUT
+):
+    """Cache the live spa configuration once its last pages have arrived.
+
+    The system information and setup parameters are waited for up to
+    timeout seconds, or for as long as it takes if timeout is None, and
+    whatever is known by then is compared with cached_config.  Returns the
+    configuration now cached and whether those pages had arrived.
+    """
+    commands = hass.data[DOMAIN][entry.entry_id][COMMANDS]
+    try:
+        await asyncio.wait_for(_async_query_pages(spa, commands), timeout)
+        complete = True
+    except asyncio.TimeoutError:
+        _LOGGER.warning(
+            "Spa at %s sent no system information or setup parameters yet",
+            spa.host,
+        )
+        complete = False
+    config = _spa_config(spa)
+    if config == cached_config:
+        return config, complete
+    await store.async_save(config)
+    if cached_config is None:
+        return config, complete
+    if any(config[key] != cached_config[key] for key in CONFIG_ENTITY_KEYS):
+        _LOGGER.info("Spa configuration changed, reloading %s", entry.title)
+        hass.async_create_task(hass.config_entries.async_reload(entry.entry_id))
+    else:
+        await _async_update_device(hass, spa)
+        async_dispatcher_send(hass, SIGNAL_CONFIG.format(entry.entry_id))
+    return config, complete
+
+
+async def _async_update_device(hass, spa):
+    """Update the spa's device with its current model and SSID.
+
+    The entities only give their device info when they are added, so a
+    model or SSID that arrives later is written to the registry here.
+    """
+    registry = await device_registry.async_get_registry(hass)
+    device = registry.async_get_device({(DOMAIN, spa.get_macaddr())})
+    if device is not None:
+        registry.async_update_device(
+            device.id, model=spa.get_model_name(), sw_version=spa.get_ssid()
+        )
+
+
+async def _async_query_pages(spa, commands):
+    """Query the configuration until its last pages have arrived."""
+    while not all(mtype in spa.responses for mtype in CONFIG_PAGES):
+        _async_query_config(commands)
+        await asyncio.sleep(0.05)
+
+
 async def update_listener(hass, entry):
     """Handle options update."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    if entry_data[DIAGNOSTICS] != entry.options.get(
+        CONF_DIAGNOSTICS, DEFAULT_DIAGNOSTICS
+    ) or entry_data[TEMPERATURE_WINDOWS] != entry.options.get(
+        CONF_TEMPERATURE_WINDOWS, DEFAULT_TEMPERATURE_WINDOWS
+    ):
+        # Optional sensors are only created when the entry is set up
+        hass.async_create_task(hass.config_entries.async_reload(entry.entry_id))
+        return
+
+    entry_data[PROFILER].enabled = entry.options.get(CONF_PROFILE, DEFAULT_PROFILE)
+    await _async_set_recording(
+        hass,
+        entry,
+        entry_data,
+        entry.options.get(CONF_RECORD_FRAMES, DEFAULT_RECORD_FRAMES),
+    )
+
     if entry.options.get(CONF_SYNC_TIME, DEFAULT_SYNC_TIME):
-        _LOGGER.info("Setting up daily time sync.")
-        spa = hass.data[DOMAIN][entry.entry_id][SPA]
-
-        async def sync_time():
-            while entry.options.get(CONF_SYNC_TIME, DEFAULT_SYNC_TIME):
-                _LOGGER.info("Syncing time with Home Assistant.")
-                await spa.set_time(
-                    time.strptime(str(dt_util.now()), "%Y-%m-%d %H:%M:%S.%f%z")
-                )
-                await asyncio.sleep(86400)
+        _async_sync_time(hass, entry, entry_data[STATUS])
+    else:
+        entry_data[SUPERVISOR].cancel_task("sync_time")
+
+
+async def _async_set_recording(hass, entry, entry_data, enabled):
+    """Start or stop recording the spa's frames to its ring file."""
+    spa = entry_data[SPA]
+    if enabled and spa.recorder is None:
+        path = hass.config.path(RECORDER_FILENAME.format(entry.entry_id))
+        spa.recorder = await hass.async_add_executor_job(
+            FrameRecorder, path, RECORDER_SIZE
+        )
+        _LOGGER.info("Recording frames from %s to %s", entry.title, path)
+        if spa.connected:
+            # Have the spa resend its configuration so the recording has it
+            commands = entry_data[COMMANDS]
+            commands.async_query(balboa.BMTR_MOD_IDENT_RESP, max_age=0)
+            commands.async_query(balboa.BMTR_DEVICE_CONFIG_RESP, max_age=0)
+    elif not enabled and spa.recorder is not None:
+        recorder, spa.recorder = spa.recorder, None
+        await hass.async_add_executor_job(recorder.close)
+
+
+@callback
+def _async_sync_time(hass, entry, status):
+    """Set the spa's clock to Home Assistant's time if it has drifted.
+
+    This runs whenever the spa's clock, which only has whole minutes, moves
+    on.  Differences under TIME_SYNC_THRESHOLD minutes are left alone, and
+    the clock is set at most once per TIME_SYNC_RETRY seconds.  Comparing
+    with local time also catches daylight saving time changes.
+    """
+    if not status.connected:
+        return
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    now = dt_util.now()
+    drift = (
+        status.time_hour * 60 + status.time_minute - now.hour * 60 - now.minute + 720
+    ) % 1440 - 720
+    if abs(drift) < TIME_SYNC_THRESHOLD:
+        return
+    synced = entry_data[TIME_SYNCED]
+    if synced is not None and time.monotonic() - synced < TIME_SYNC_RETRY:
+        return
+    _LOGGER.info("Spa clock is %d minutes off, syncing it with Home Assistant", drift)
+    entry_data[TIME_SYNCED] = time.monotonic()
+    entry_data[SUPERVISOR].start_task(
+        "sync_time", entry_data[SPA].set_time(now.timetuple())
+    )
+
+
+class SpaStatus(
+    namedtuple(
+        "SpaStatus",
+        [
+            STATUS_CONNECTED,
+            STATUS_HEATMODE,
+            STATUS_HEATSTATE,
+            STATUS_CURTEMP,
+            STATUS_SETTEMP,
+            STATUS_TEMPRANGE,
+            STATUS_TEMPSCALE,
+            STATUS_FILTER_MODE,
+            "time_hour",
+            "time_minute",
+            STATUS_PUMP,
+            STATUS_LIGHT,
+            STATUS_AUX,
+            STATUS_BLOWER,
+            STATUS_MISTER,
+            STATUS_CIRC_PUMP,
+        ],
+    )
+):
+    """Immutable snapshot of the spa status, decoded once per frame.
 
-        hass.loop.create_task(sync_time())
+    Entities read their state from the snapshot instead of calling back into
+    the pybalboa getters on every state write.  The pump, light and aux
+    fields are tuples indexed from zero, like the pybalboa arrays.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_spa(cls, spa):
+        """Build a snapshot from the current state of a BalboaSpaWifi."""
+        return cls(
+            spa.connected,
+            spa.heatmode,
+            spa.heatstate,
+            spa.curtemp,
+            spa.settemp,
+            spa.temprange,
+            spa.tempscale,
+            spa.filter_mode,
+            spa.time_hour,
+            spa.time_minute,
+            tuple(spa.pump_status),
+            tuple(spa.light_status),
+            tuple(spa.aux_status),
+            spa.blower_status,
+            spa.mister_status,
+            spa.circ_pump_status,
+        )
+
+    def changed_fields(self, previous):
+        """Return the STATUS_FIELDS that differ from a previous snapshot."""
+        changed = set()
+        for names, old, new in zip(_CHANGE_NAMES, previous, self):
+            if old == new:
+                continue
+            if isinstance(names, tuple):
+                changed.update(
+                    name for name, was, now in zip(names, old, new) if was != now
+                )
+            else:
+                changed.add(names)
+        return changed
+
+    def field_values(self, names):
+        """Return the values of STATUS_FIELDS names, keyed by name.
+
+        Numbered names like pump2 pick an item of their array field, and
+        the time is returned as HH:MM.
+        """
+        values = {}
+        for name in names:
+            if name == STATUS_TIME:
+                values[name] = f"{self.time_hour:02d}:{self.time_minute:02d}"
+            elif name in self._fields:
+                values[name] = getattr(self, name)
+            else:
+                values[name] = getattr(self, name[:-1])[int(name[-1]) - 1]
+        return values
+
+    def replace_item(self, field, index, value):
+        """Return a copy with one item of an array field replaced."""
+        items = list(getattr(self, field))
+        items[index] = value
+        return self._replace(**{field: tuple(items)})
+
+
+# The STATUS_FIELDS name reported for each SpaStatus field when it changes
+_CHANGE_NAMES = (
+    STATUS_CONNECTED,
+    STATUS_HEATMODE,
+    STATUS_HEATSTATE,
+    STATUS_CURTEMP,
+    STATUS_SETTEMP,
+    STATUS_TEMPRANGE,
+    STATUS_TEMPSCALE,
+    STATUS_FILTER_MODE,
+    STATUS_TIME,
+    STATUS_TIME,
+    tuple(f"{STATUS_PUMP}{num}" for num in range(1, 7)),
+    tuple(f"{STATUS_LIGHT}{num}" for num in range(1, 3)),
+    tuple(f"{STATUS_AUX}{num}" for num in range(1, 3)),
+    STATUS_BLOWER,
+    STATUS_MISTER,
+    STATUS_CIRC_PUMP,
+)
 
 
 class BalboaEntity(Entity):
@@ -147,25 +729,195 @@ class BalboaEntity(Entity):
     def __init__(self, hass, entry, type, num=None):
         """Initialize the spa entity."""
         self.hass = hass
-        self._client = hass.data[DOMAIN][entry.entry_id][SPA]
+        self._entry = entry
+        self._entry_data = hass.data[DOMAIN][entry.entry_id]
+        self._client = self._entry_data[SPA]
+        self._status = self._entry_data[STATUS]
         self._device_name = entry.data[CONF_NAME]
         self._type = type
         self._num = num
+        self._name = f'{self._device_name}: {type}{num or ""}'
+        self._unique_id = f'{self._device_name}-{type}{num or ""}-{self._client.get_macaddr().replace(":","")[-6:]}'
+        self._watched = frozenset((STATUS_CONNECTED, *self._status_fields()))
+        self._watched_discrete = self._watched - THROTTLED_STATUS_FIELDS
+        self._last_publish = 0
+        self._unsub_publish = None
+        self._optimistic = None
+        self._unsub_rollback = None
+        self._profiler = self._entry_data[PROFILER]
+        self._status_reads = 0
+        self._update_metadata()
+
+    def _update_metadata(self) -> None:
+        """Compute the attributes that only change with the spa configuration.
+
+        This runs when the entity is created and again if the spa reports a
+        configuration that differs from the cached one, rather than on every
+        state write.  Changes to the spa's equipment or MAC address reload
+        the entry instead, so the name and unique ID never change.
+        """
+        client = self._client
+        self._device_info = {
+            "identifiers": {(DOMAIN, client.get_macaddr())},
+            "name": self._device_name,
+            "manufacturer": "Balboa Water Group",
+            "model": client.get_model_name(),
+            "sw_version": client.get_ssid(),
+            "connections": {(CONNECTION_NETWORK_MAC, client.get_macaddr())},
+        }
 
     @property
     def name(self):
         """Return the name of the entity."""
-        return f'{self._device_name}: {self._type}{self._num or ""}'
+        return self._name
+
+    def _status_fields(self):
+        """Return the status fields this entity's state is built from."""
+        return ()
 
     async def async_added_to_hass(self) -> None:
         """Set up a listener for the entity."""
-        async_dispatcher_connect(self.hass, DOMAIN, self._update_callback)
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_UPDATE.format(self._entry.entry_id),
+                self._update_callback,
+            )
+        )
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_CONFIG.format(self._entry.entry_id),
+                self._config_callback,
+            )
+        )
+        self.async_on_remove(self._cancel_publish)
+        self.async_on_remove(self._end_optimistic)
+
+    @callback
+    def _config_callback(self) -> None:
+        """Call from dispatcher when the spa configuration changes."""
+        self._update_metadata()
+        self._publish()
+
+    @callback
+    def _update_callback(self, status, changed) -> None:
+        """Call from dispatcher when the spa status changes."""
+        if not self._profiler.enabled:
+            self._handle_update(status, changed)
+            return
+        start = time.perf_counter()
+        self._status_reads = 0
+        self._handle_update(status, changed)
+        self._profiler.record_callback(
+            self.entity_id, time.perf_counter() - start, self._status_reads
+        )
+
+    @callback
+    def _handle_update(self, status, changed) -> None:
+        """Take in a new spa status and publish it if it concerns us.
+
+        Changes to slowly varying values such as the water temperature are
+        published at most once per the configured publish interval.  Discrete
+        changes, and anything shortly after a user command, are published
+        immediately.
+
+        While a command is shown optimistically its requested state is laid
+        over the status, until a status shows the command applied.
+        """
+        if self._optimistic is not None:
+            applied, overlay = self._optimistic
+            if applied(status):
+                self._end_optimistic()
+            else:
+                status = overlay(status)
+        self._status = status
+        if self._watched.isdisjoint(changed):
+            return
+        interval = self._entry.options.get(
+            CONF_PUBLISH_INTERVAL, DEFAULT_PUBLISH_INTERVAL
+        )
+        now = time.monotonic()
+        if (
+            interval
+            and self._watched_discrete.isdisjoint(changed)
+            and now - self._entry_data[COMMANDS].last_sent > COMMAND_FLUSH_WINDOW
+            and now - self._last_publish < interval
+        ):
+            if self._unsub_publish is None:
+                self._unsub_publish = async_call_later(
+                    self.hass, self._last_publish + interval - now, self._publish
+                )
+            return
+        self._publish()
+
+    @callback
+    def _publish(self, _now=None) -> None:
+        """Write the entity state, replacing any delayed write."""
+        self._cancel_publish()
+        self._last_publish = time.monotonic()
+        if not self._profiler.enabled:
+            self.async_write_ha_state()
+            return
+        status = self._status
+        self._status = counting = CountingStatus(status)
+        try:
+            self.async_write_ha_state()
+        finally:
+            self._status = status
+        self._status_reads += counting.reads
+
+    @callback
+    def _cancel_publish(self) -> None:
+        """Cancel a delayed state write."""
+        if self._unsub_publish is not None:
+            self._unsub_publish()
+            self._unsub_publish = None
+
+    async def _async_send_command(
+        self, key, send, applied, toggle=True, overlay=None
+    ) -> bool:
+        """Queue a command for the spa and wait until it is confirmed.
+
+        See CommandQueue.async_submit for the arguments.  If the optimistic
+        window option is set, overlay is called with a status to return it
+        as it will be once the command is applied, and the entity shows that
+        state straight away.  It reverts to the spa's state if the spa does
+        not confirm the command within the window.  Returns whether a status
+        from the spa showed the command applied.
+        """
+        future = self._entry_data[COMMANDS].async_submit(key, send, applied, toggle)
+        window = self._entry.options.get(
+            CONF_OPTIMISTIC_WINDOW, DEFAULT_OPTIMISTIC_WINDOW
+        )
+        if overlay is None or not window or future.done():
+            return await future
+
+        self._end_optimistic()
+        optimistic = self._optimistic = (applied, overlay)
+        self._unsub_rollback = async_call_later(self.hass, window, self._rollback)
+        self._status = overlay(self._entry_data[STATUS])
+        self._publish()
+        result = await future
+        if not result and self._optimistic is optimistic:
+            self._rollback()
+        return result
 
     @callback
-    def _update_callback(self) -> None:
-        """Call from dispatcher when state changes."""
-        _LOGGER.debug(f"Updating {self.name} state with new data.")
-        self.async_schedule_update_ha_state(force_refresh=True)
+    def _rollback(self, _now=None) -> None:
+        """Stop showing a command optimistically and revert to the spa's state."""
+        _LOGGER.debug("%s: spa did not confirm the requested state", self.name)
+        self._end_optimistic()
+        self._status = self._entry_data[STATUS]
+        self._publish()
+
+    @callback
+    def _end_optimistic(self) -> None:
+        """Stop laying a command's requested state over the spa status."""
+        self._optimistic = None
+        if self._unsub_rollback is not None:
+            self._unsub_rollback()
+            self._unsub_rollback = None
 
     @property
     def should_poll(self) -> bool:
@@ -175,7 +927,7 @@ class BalboaEntity(Entity):
     @property
     def unique_id(self):
         """Set unique_id for this entity."""
-        return f'{self._device_name}-{self._type}{self._num or ""}-{self._client.get_macaddr().replace(":","")[-6:]}'
+        return self._unique_id
 
     @property
     def assumed_state(self) -> bool:
@@ -187,16 +939,9 @@ class BalboaEntity(Entity):
     @property
     def available(self) -> bool:
         """Return whether the entity is available or not."""
-        return self._client.connected
+        return self._status.connected
 
     @property
     def device_info(self) -> Dict[str, Any]:
         """Return the device information for this entity."""
-        return {
-            "identifiers": {(DOMAIN, self._client.get_macaddr())},
-            "name": self._device_name,
-            "manufacturer": "Balboa Water Group",
-            "model": self._client.get_model_name(),
-            "sw_version": self._client.get_ssid(),
-            "connections": {(CONNECTION_NETWORK_MAC, self._client.get_macaddr())},
-        }
+        return self._device_info
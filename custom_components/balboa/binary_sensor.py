@@ -5,7 +5,21 @@ from homeassistant.components.binary_sensor import (
 )
 
 from . import BalboaEntity
-from .const import _LOGGER, CIRC_PUMP, DOMAIN, FILTER, SPA
+from .const import (
+    _LOGGER,
+    CIRC_PUMP,
+    DOMAIN,
+    FILTER,
+    SPA,
+    STATUS_CIRC_PUMP,
+    STATUS_FILTER_MODE,
+)
+
+# (off, on) icons of each binary sensor type
+BINARY_SENSOR_ICONS = {
+    CIRC_PUMP: ("mdi:water-pump-off", "mdi:water-pump"),
+    FILTER: ("mdi:sync-off", "mdi:sync"),
+}
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
@@ -19,27 +33,35 @@ async def async_setup_entry(hass, entry, async_add_entities):
     if spa.have_circ_pump():
         devs.append(BalboaSpaBinarySensor(hass, entry, CIRC_PUMP))
 
-    async_add_entities(devs, True)
+    async_add_entities(devs)
 
 
 class BalboaSpaBinarySensor(BalboaEntity, BinarySensorEntity):
     """Representation of a Balboa Spa binary sensor entity."""
 
+    def __init__(self, hass, entry, type, num=None):
+        """Initialize the sensor and work out when it is on."""
+        super().__init__(hass, entry, type, num)
+        self._icons = BINARY_SENSOR_ICONS[type]
+        # The filter modes in which this filter cycle runs
+        self._on_modes = None
+        if type == FILTER:
+            client = self._client
+            cycle = client.FILTER_1 if num == 1 else client.FILTER_2
+            self._on_modes = frozenset((cycle, client.FILTER_1_2))
+
+    def _status_fields(self):
+        """Return the status fields this entity's state is built from."""
+        if self._type == CIRC_PUMP:
+            return (STATUS_CIRC_PUMP,)
+        return (STATUS_FILTER_MODE,)
+
     @property
     def is_on(self) -> bool:
         """Return true if the binary sensor is on."""
-        if self._type == CIRC_PUMP:
-            return self._client.get_circ_pump()
-        if self._type == FILTER:
-            fmode = self._client.get_filtermode()
-            if fmode == self._client.FILTER_OFF:
-                return False
-            if self._num == 1 and fmode != self._client.FILTER_2:
-                return True
-            if self._num == 2 and fmode >= self._client.FILTER_2:
-                return True
-            return False
-        return False
+        if self._on_modes is None:
+            return self._status.circ_pump
+        return self._status.filter_mode in self._on_modes
 
     @property
     def device_class(self):
@@ -49,6 +71,5 @@ class BalboaSpaBinarySensor(BalboaEntity, BinarySensorEntity):
     @property
     def icon(self):
         """Return the icon to use in the frontend, if any."""
-        if self._type == CIRC_PUMP:
-            return "mdi:water-pump" if self.is_on else "mdi:water-pump-off"
-        return "mdi:sync" if self.is_on else "mdi:sync-off"
+        off, on = self._icons
+        return on if self.is_on else off
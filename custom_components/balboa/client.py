@@ -0,0 +1,97 @@
+"""Balboa spa client with link statistics and frame recording."""
+import time
+
+from pybalboa import BalboaSpaWifi, balboa
+
+# Request for each response the spa can be queried for: the send_panel_req
+# arguments, or None for the module identification request
+QUERY_REQUESTS = {
+    balboa.BMTR_MOD_IDENT_RESP: None,
+    balboa.BMTR_DEVICE_CONFIG_RESP: (0, 1),
+    balboa.BMTR_SYS_INFO_RESP: (2, 0),
+    balboa.BMTR_SETUP_PARAMS_RESP: (4, 0),
+    balboa.BMTR_FILTER_INFO_RESP: (1, 0),
+}
+# Responses with the model, SSID and temperature limits, which the spa
+# sends after its identification and device configuration
+CONFIG_PAGES = (balboa.BMTR_SYS_INFO_RESP, balboa.BMTR_SETUP_PARAMS_RESP)
+# Message type of each queried response, by its type bytes
+RESPONSE_TYPES = {bytes(balboa.mtypes[mtype]): mtype for mtype in QUERY_REQUESTS}
+
+# pybalboa parser for each response the identify probe waits for
+IDENTIFY_PARSERS = {
+    balboa.BMTR_MOD_IDENT_RESP: "parse_module_identification",
+    balboa.BMTR_DEVICE_CONFIG_RESP: "parse_device_configuration",
+    balboa.BMTR_SYS_INFO_RESP: "parse_system_information",
+    balboa.BMTR_SETUP_PARAMS_RESP: "parse_setup_parameters",
+}
+
+
+class BalboaSpaClient(BalboaSpaWifi):
+    """BalboaSpaWifi that counts the frames it reads.
+
+    pybalboa logs and drops frames it cannot read (bad start byte, bad
+    checksum, short reads) by returning None while still connected; those
+    are counted as decode errors.  Frames that are read are also appended
+    to recorder, a FrameRecorder, when one is set.  The time each queried
+    response last arrived is kept in responses, by message type.
+    """
+
+    def __init__(self, hostname, *args, **kwargs):
+        """Initialize the client."""
+        super().__init__(hostname, *args, **kwargs)
+        self.frames = 0
+        self.decode_errors = 0
+        self.recorder = None
+        self.responses = {}
+
+    async def read_one_message(self):
+        """Read one frame from the spa, counting it."""
+        data = await super().read_one_message()
+        if data is not None:
+            self.frames += 1
+            if self.recorder is not None:
+                self.recorder.record(data)
+            mtype = RESPONSE_TYPES.get(data[2:5])
+            if mtype is not None:
+                self.responses[mtype] = time.monotonic()
+        elif self.connected:
+            self.decode_errors += 1
+        return data
+
+    async def send_query(self, mtype):
+        """Send the request the spa answers with a response of type mtype."""
+        panel = QUERY_REQUESTS[mtype]
+        if panel is None:
+            await self.send_mod_ident_req()
+        else:
+            await self.send_panel_req(*panel)
+
+    async def async_identify(self):
+        """Request the spa's identity and configuration and read until it arrives.
+
+        This covers everything the integration caches about a spa, and the
+        first status once the configuration is known.  Unlike
+        spa_configured, it reads the responses itself rather than relying on
+        listen, so it must run before listen is started, and it does not
+        pause between messages.  Returns False if the connection is lost.
+        """
+        for mtype in IDENTIFY_PARSERS:
+            await self.send_query(mtype)
+        pending = {*IDENTIFY_PARSERS, balboa.BMTR_STATUS_UPDATE}
+        while pending:
+            data = await self.read_one_message()
+            if data is None:
+                if not self.connected or self.reader.at_eof():
+                    return False
+                continue
+            mtype = self.find_balboa_mtype(data)
+            if mtype == balboa.BMTR_STATUS_UPDATE:
+                # Status updates are ignored until the configuration is known
+                if self.config_loaded:
+                    await self.parse_status_update(data)
+                    pending.discard(mtype)
+            elif mtype in pending:
+                getattr(self, IDENTIFY_PARSERS[mtype])(data)
+                pending.discard(mtype)
+        return True
@@ -1,5 +1,6 @@
 """Support for Balboa Spa Wifi adaptor."""
 import math
+from functools import partial
 from typing import List
 
 from homeassistant.components.climate import ClimateEntity
@@ -24,6 +25,7 @@ from homeassistant.const import (
     TEMP_CELSIUS,
     TEMP_FAHRENHEIT,
 )
+from homeassistant.core import callback
 
 from . import BalboaEntity
 from .const import (
@@ -31,39 +33,97 @@ from .const import (
     CLIMATE,
     CLIMATE_SUPPORTED_FANSTATES,
     CLIMATE_SUPPORTED_MODES,
+    CLIMATE_SUPPORTED_MODES_RNR,
+    STATUS_BLOWER,
+    STATUS_CURTEMP,
+    STATUS_HEATMODE,
+    STATUS_HEATSTATE,
+    STATUS_SETTEMP,
+    STATUS_TEMPRANGE,
+    STATUS_TEMPSCALE,
+    STATUS_TIME,
 )
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up the spa climate device."""
-    async_add_entities([BalboaSpaClimate(hass, entry, CLIMATE)], True)
+    async_add_entities([BalboaSpaClimate(hass, entry, CLIMATE)])
 
 
 class BalboaSpaClimate(BalboaEntity, ClimateEntity):
     """Representation of a Balboa Spa Climate device."""
 
-    @property
-    def supported_features(self):
-        """Return the list of supported features."""
+    def __init__(self, hass, entry, type):
+        """Initialize the spa climate device."""
+        super().__init__(hass, entry, type)
+        self._heatmode_list = self._client.get_heatmode_stringlist()
+        self._rest_modes = [
+            mode
+            for mode in self._heatmode_list
+            # only return "Ready in Rest" as an option if the spa is currently in that
+            # mode since it is a status rather than an available mode to be selected
+            if mode != self._heatmode_list[self._client.HEATMODE_RNR]
+        ]
+
+    def _status_fields(self):
+        """Return the status fields this entity's state is built from."""
+        return (
+            STATUS_BLOWER,
+            STATUS_CURTEMP,
+            STATUS_HEATMODE,
+            STATUS_HEATSTATE,
+            STATUS_SETTEMP,
+            STATUS_TEMPRANGE,
+            STATUS_TEMPSCALE,
+            STATUS_TIME,
+        )
+
+    def _update_metadata(self) -> None:
+        """Compute the features and temperature limits of the spa."""
+        super()._update_metadata()
+        self._have_blower = self._client.have_blower()
         features = SUPPORT_TARGET_TEMPERATURE | SUPPORT_PRESET_MODE
 
-        if self._client.have_blower():
+        if self._have_blower:
             features |= SUPPORT_FAN_MODE
 
-        return features
+        self._supported_features = features
+        self._update_temperature_limits(self._status)
+
+    def _update_temperature_limits(self, status) -> None:
+        """Compute the temperature unit and limits for the current range."""
+        client = self._client
+        if status.tempscale == client.TSCALE_C:
+            self._temperature_unit = TEMP_CELSIUS
+        else:
+            self._temperature_unit = TEMP_FAHRENHEIT
+        self._min_temp = client.tmin[status.temprange][status.tempscale]
+        self._max_temp = client.tmax[status.temprange][status.tempscale]
+
+    @callback
+    def _handle_update(self, status, changed) -> None:
+        """Follow changes of temperature range and scale, then update."""
+        if STATUS_TEMPRANGE in changed or STATUS_TEMPSCALE in changed:
+            self._update_temperature_limits(status)
+        super()._handle_update(status, changed)
+
+    @property
+    def supported_features(self):
+        """Return the list of supported features."""
+        return self._supported_features
 
     @property
     def hvac_modes(self) -> List[str]:
         """Return the list of supported HVAC modes."""
-        if self._client.get_heatmode() == self._client.HEATMODE_RNR:
-            return [*CLIMATE_SUPPORTED_MODES, HVAC_MODE_AUTO]
+        if self._status.heatmode == self._client.HEATMODE_RNR:
+            return CLIMATE_SUPPORTED_MODES_RNR
         else:
             return CLIMATE_SUPPORTED_MODES
 
     @property
     def hvac_mode(self) -> str:
         """Return the current HVAC mode."""
-        mode = self._client.get_heatmode()
+        mode = self._status.heatmode
         if mode == self._client.HEATMODE_READY:
             return HVAC_MODE_HEAT
         elif mode == self._client.HEATMODE_RNR:
@@ -74,7 +134,7 @@ class BalboaSpaClimate(BalboaEntity, ClimateEntity):
     @property
     def hvac_action(self) -> str:
         """Return the current operation mode."""
-        state = self._client.get_heatstate()
+        state = self._status.heatstate
         if state >= self._client.ON:
             return CURRENT_HVAC_HEAT
         return CURRENT_HVAC_IDLE
@@ -87,9 +147,9 @@ class BalboaSpaClimate(BalboaEntity, ClimateEntity):
     @property
     def fan_mode(self) -> str:
         """Return the current fan mode."""
-        fanmode = self._client.get_blower()
-        if fanmode is None:
+        if not self._have_blower:
             return FAN_OFF
+        fanmode = self._status.blower
         if fanmode == self._client.BLOWER_OFF:
             return FAN_OFF
         if fanmode == self._client.BLOWER_LOW:
@@ -118,58 +178,45 @@ class BalboaSpaClimate(BalboaEntity, ClimateEntity):
     @property
     def temperature_unit(self):
         """Return the unit of measurement, as defined by the API."""
-        tscale = self._client.get_tempscale()
-        if tscale == self._client.TSCALE_C:
-            return TEMP_CELSIUS
-        return TEMP_FAHRENHEIT
+        return self._temperature_unit
 
     @property
     def current_temperature(self):
         """Return the current temperature."""
-        return self._client.get_curtemp()
+        return self._status.curtemp
 
     @property
     def target_temperature(self):
         """Return the target temperature we try to reach."""
-        return self._client.get_settemp()
+        return self._status.settemp
 
     @property
     def min_temp(self) -> int:
         """Return the minimum temperature supported by the spa."""
-        trange = self._client.get_temprange()
-        scale = self._client.get_tempscale()
-        return self._client.tmin[trange][scale]
+        return self._min_temp
 
     @property
     def max_temp(self) -> int:
-        """Return the minimum temperature supported by the spa."""
-        trange = self._client.get_temprange()
-        scale = self._client.get_tempscale()
-        return self._client.tmax[trange][scale]
+        """Return the maximum temperature supported by the spa."""
+        return self._max_temp
 
     @property
     def preset_modes(self):
         """Return the valid preset modes."""
-        modes = [
-            mode
-            for mode in self._client.get_heatmode_stringlist()
-            # only return "Ready in Rest" as an option if the spa is currently in that
-            # mode since it is a status rather than an available mode to be selected
-            if self._client.get_heatmode() == self._client.HEATMODE_RNR
-            or mode != self._client.get_heatmode_stringlist()[self._client.HEATMODE_RNR]
-        ]
-        return modes
+        if self._status.heatmode == self._client.HEATMODE_RNR:
+            return self._heatmode_list
+        return self._rest_modes
 
     @property
     def preset_mode(self):
         """Return current preset mode."""
-        return self._client.get_heatmode(True)
+        return self._heatmode_list[self._status.heatmode]
 
     @property
     def device_state_attributes(self):
         """Return device specific state attributes."""
         return {
-            "time": f"{self._client.time_hour:02d}:{self._client.time_minute:02d}",
+            "time": f"{self._status.time_hour:02d}:{self._status.time_minute:02d}",
         }
 
     async def async_set_temperature(self, **kwargs):
@@ -181,24 +228,37 @@ class BalboaSpaClimate(BalboaEntity, ClimateEntity):
                 temperature = math.floor(temperature + 0.5)
             else:
                 temperature = 0.5 * round(temperature / 0.5)
-        await self._client.send_temp_change(temperature)
+        await self._async_send_command(
+            STATUS_SETTEMP,
+            partial(self._client.send_temp_change, temperature),
+            lambda status: status.settemp == temperature,
+            toggle=False,
+            overlay=lambda status: status._replace(settemp=temperature),
+        )
 
     async def async_set_preset_mode(self, preset_mode) -> None:
         """Set new preset mode."""
         modelist = self._client.get_heatmode_stringlist()
         if preset_mode in modelist:
-            await self._client.change_heatmode(modelist.index(preset_mode))
+            await self._async_set_heatmode(modelist.index(preset_mode))
 
     async def async_set_fan_mode(self, fan_mode):
         """Set new fan mode."""
         if fan_mode == FAN_OFF:
-            await self._client.change_blower(self._client.BLOWER_OFF)
+            blower = self._client.BLOWER_OFF
         elif fan_mode == FAN_LOW:
-            await self._client.change_blower(self._client.BLOWER_LOW)
+            blower = self._client.BLOWER_LOW
         elif fan_mode == FAN_MEDIUM:
-            await self._client.change_blower(self._client.BLOWER_MEDIUM)
+            blower = self._client.BLOWER_MEDIUM
         elif fan_mode == FAN_HIGH:
-            await self._client.change_blower(self._client.BLOWER_HIGH)
+            blower = self._client.BLOWER_HIGH
+        else:
+            return
+        await self._async_send_command(
+            STATUS_BLOWER,
+            partial(self._client.change_blower, blower),
+            lambda status: status.blower == blower,
+        )
 
     async def async_set_hvac_mode(self, hvac_mode):
         """Set new target hvac mode.
@@ -208,9 +268,17 @@ class BalboaSpaClimate(BalboaEntity, ClimateEntity):
         HEAT = Ready
         """
         if hvac_mode == HVAC_MODE_HEAT:
-            await self._client.change_heatmode(self._client.HEATMODE_READY)
+            await self._async_set_heatmode(self._client.HEATMODE_READY)
         else:
-            await self._client.change_heatmode(self._client.HEATMODE_REST)
+            await self._async_set_heatmode(self._client.HEATMODE_REST)
+
+    async def _async_set_heatmode(self, heatmode):
+        """Queue a heat mode change."""
+        await self._async_send_command(
+            STATUS_HEATMODE,
+            partial(self._client.change_heatmode, heatmode),
+            lambda status: status.heatmode == heatmode,
+        )
 
     def get_temp_unit(self):
         """Return the balboa equivalent temperature unit of the system."""
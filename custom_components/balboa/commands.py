@@ -0,0 +1,248 @@
+"""Outbound command queue for a Balboa spa connection."""
+import asyncio
+import time
+from collections import deque
+
+from homeassistant.core import callback
+
+from .const import (
+    _LOGGER,
+    COMMAND_CONFIRM_TIMEOUT,
+    COMMAND_LATENCY_SAMPLES,
+    COMMAND_RETRIES,
+    COMMAND_TOGGLE_INTERVAL,
+    QUERY_INTERVAL,
+    QUERY_TIMEOUT,
+    QUERY_TTL,
+)
+
+
+class Command:
+    """A request to bring one target on the spa to a new state."""
+
+    __slots__ = ("key", "send", "applied", "toggle", "futures")
+
+    def __init__(self, key, send, applied, toggle, futures):
+        """Initialize the command."""
+        self.key = key
+        self.send = send
+        self.applied = applied
+        self.toggle = toggle
+        self.futures = futures
+
+
+class Query:
+    """A background request for one type of spa response."""
+
+    __slots__ = ("mtype", "max_age", "futures")
+
+    def __init__(self, mtype, max_age, futures):
+        """Initialize the query."""
+        self.mtype = mtype
+        self.max_age = max_age
+        self.futures = futures
+
+
+class CommandQueue:
+    """Send commands to the spa one at a time and confirm they took effect.
+
+    Commands are keyed by their target (a pump, the set temperature, ...).
+    Submitting a command for a target that already has one waiting replaces
+    it, so only the latest request is sent.  Most spa controls are buttons
+    that toggle, so those commands are spaced out to give the Wi-Fi module
+    time to act on each press.  A command is done once a status frame shows
+    it applied; otherwise it is sent again, up to COMMAND_RETRIES times.
+
+    Background requests for configuration and panel pages are queried
+    through the same queue, so they never compete with user commands: one
+    is only sent when no command is waiting, at most one per QUERY_INTERVAL.
+    They are keyed by the type of response they ask for, so repeated
+    requests for the same page are sent once, and a page that arrived
+    recently enough is not asked for again.
+    """
+
+    def __init__(self, hass, spa, status=None):
+        """Initialize the queue with the current spa status."""
+        self.hass = hass
+        self.spa = spa
+        self.status = status
+        self.last_sent = 0
+        self.latencies = deque(maxlen=COMMAND_LATENCY_SAMPLES)
+        self._pending = {}
+        self._queries = {}
+        self._queried = {}
+        self._wakeup = asyncio.Event()
+        self._updated = asyncio.Event()
+        self._last_toggle = 0
+        self._last_query = 0
+
+    def async_submit(self, key, send, applied, toggle=True):
+        """Queue a command and return a future for its outcome.
+
+        send is called without arguments to get the coroutine that sends the
+        command, and applied is called with each new status to tell whether
+        the command has taken effect.  The future's result is True once it
+        has, and False if the spa never confirmed it.
+        """
+        future = self.hass.loop.create_future()
+        superseded = self._pending.get(key)
+        futures = superseded.futures if superseded is not None else []
+        futures.append(future)
+        self._pending[key] = Command(key, send, applied, toggle, futures)
+        self._wakeup.set()
+        self._updated.set()
+        return future
+
+    def async_query(self, mtype, max_age=QUERY_TTL):
+        """Queue a background request for a spa response, unless it is fresh.
+
+        mtype is the pybalboa message type of the response wanted.  Nothing
+        is sent if a response of that type arrived within max_age seconds,
+        or if the request went out less than QUERY_TIMEOUT ago and is still
+        unanswered.  The future's result is True once the request is sent
+        or found unnecessary, and False if it is dropped because the spa is
+        not connected.
+        """
+        future = self.hass.loop.create_future()
+        if self._fresh(mtype, max_age):
+            future.set_result(True)
+            return future
+        query = self._queries.get(mtype)
+        if query is None:
+            query = self._queries[mtype] = Query(mtype, max_age, [])
+        query.max_age = min(query.max_age, max_age)
+        query.futures.append(future)
+        self._wakeup.set()
+        return future
+
+    def _fresh(self, mtype, max_age):
+        """Return whether a response needs no new request."""
+        now = time.monotonic()
+        received = self.spa.responses.get(mtype)
+        if received is not None and now - received <= max_age:
+            return True
+        sent = self._queried.get(mtype)
+        return (
+            sent is not None
+            and now - sent < QUERY_TIMEOUT
+            and (received is None or received < sent)
+        )
+
+    @callback
+    def async_status_updated(self, status):
+        """Record a new spa status."""
+        self.status = status
+        self._updated.set()
+
+    async def async_run(self):
+        """Send queued commands until cancelled."""
+        command = None
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._pending or self._queries:
+                    if not self._pending:
+                        await self._async_send_query()
+                        continue
+                    command = self._pending.pop(next(iter(self._pending)))
+                    await self._async_execute(command)
+                    command = None
+        finally:
+            if command is not None:
+                _resolve(command, False)
+            for command in (*self._pending.values(), *self._queries.values()):
+                _resolve(command, False)
+            self._pending.clear()
+            self._queries.clear()
+
+    async def _async_send_query(self):
+        """Send the oldest background query, once the query rate allows."""
+        delay = self._last_query + QUERY_INTERVAL - time.monotonic()
+        if delay > 0:
+            # Wait out the rate limit, unless a command arrives meanwhile
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            return
+        query = self._queries.pop(next(iter(self._queries)))
+        if self._fresh(query.mtype, query.max_age):
+            _resolve(query, True)
+            return
+        if not self.spa.connected:
+            _LOGGER.debug("Spa not connected, dropping query %s", query.mtype)
+            _resolve(query, False)
+            return
+        self._last_query = self._queried[query.mtype] = time.monotonic()
+        try:
+            await self.spa.send_query(query.mtype)
+        except asyncio.CancelledError:
+            _resolve(query, False)
+            raise
+        _resolve(query, True)
+
+    async def _async_execute(self, command):
+        """Send a command until the spa confirms it, or give up."""
+        for attempt in range(COMMAND_RETRIES + 1):
+            if command.applied(self.status):
+                _resolve(command, True)
+                return
+            if not self.spa.connected:
+                _LOGGER.warning("Spa not connected, dropping %s command", command.key)
+                _resolve(command, False)
+                return
+            if command.toggle:
+                await asyncio.sleep(
+                    self._last_toggle + COMMAND_TOGGLE_INTERVAL - time.monotonic()
+                )
+            sent = self.last_sent = time.monotonic()
+            await command.send()
+            if command.toggle:
+                self._last_toggle = time.monotonic()
+            if await self._async_wait_applied(command):
+                latency = time.monotonic() - sent
+                self.latencies.append(latency)
+                _LOGGER.debug(
+                    "Spa confirmed %s command after %.2fs", command.key, latency
+                )
+                _resolve(command, True)
+                return
+            newer = self._pending.get(command.key)
+            if newer is not None:
+                # Hand our callers over to the command that replaced this one
+                newer.futures[:0] = command.futures
+                return
+            _LOGGER.debug(
+                "Spa did not confirm %s command, attempt %d", command.key, attempt + 1
+            )
+        _LOGGER.warning("Spa did not confirm %s command, giving up", command.key)
+        _resolve(command, False)
+
+    async def _async_wait_applied(self, command):
+        """Wait for a status showing the command applied.
+
+        Toggle commands are waited on even if a newer command for the same
+        target arrives, since that one is worked out from the state the
+        spa reports after this one.
+        """
+        deadline = time.monotonic() + COMMAND_CONFIRM_TIMEOUT
+        while not command.applied(self.status):
+            if not command.toggle and command.key in self._pending:
+                return False
+            self._updated.clear()
+            try:
+                await asyncio.wait_for(
+                    self._updated.wait(), deadline - time.monotonic()
+                )
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+
+def _resolve(command, result):
+    """Report the outcome of a command or query to everyone waiting on it."""
+    for future in command.futures:
+        if not future.done():
+            future.set_result(result)
@@ -1,34 +1,94 @@
 """Config flow for Balboa Spa Client integration."""
+import asyncio
 from typing import Any, Dict, Optional
 
 import voluptuous as vol
 from homeassistant import config_entries, core, exceptions
 from homeassistant.const import CONF_HOST, CONF_NAME
 from homeassistant.core import callback
-from pybalboa import BalboaSpaWifi
+from homeassistant.data_entry_flow import AbortFlow
+from homeassistant.helpers.event import async_call_later
 
-from .const import _LOGGER, CONF_SYNC_TIME, DOMAIN
+from .const import (
+    _LOGGER,
+    CONNECT_TIMEOUT,
+    CONF_DIAGNOSTICS,
+    CONF_OPTIMISTIC_WINDOW,
+    CONF_PROFILE,
+    CONF_PUBLISH_INTERVAL,
+    CONF_RECORD_FRAMES,
+    CONF_SYNC_TIME,
+    CONF_TEMPERATURE_WINDOWS,
+    DEFAULT_DIAGNOSTICS,
+    DEFAULT_OPTIMISTIC_WINDOW,
+    DEFAULT_PROFILE,
+    DEFAULT_PUBLISH_INTERVAL,
+    DEFAULT_RECORD_FRAMES,
+    DEFAULT_TEMPERATURE_WINDOWS,
+    DOMAIN,
+    IDENTIFY_TIMEOUT,
+    PROBE_HANDOFF_TIMEOUT,
+    PROBES,
+)
+from .client import BalboaSpaClient
+from .discovery import async_discover_spas
 
 DATA_SCHEMA = vol.Schema(
     {vol.Required(CONF_HOST): str, vol.Required(CONF_NAME, default="Spa"): str}
 )
+MANUAL_ENTRY = "manual"
 
 
 async def validate_input(hass: core.HomeAssistant, data):
-    """Validate the user input allows us to connect."""
+    """Validate the user input allows us to connect.
+
+    The spa is identified over the new connection, which is returned still
+    open so that the first setup of the entry can take it over.
+    """
     for entry in hass.config_entries.async_entries(DOMAIN):
         if entry.data[CONF_HOST] == data[CONF_HOST]:
             raise AlreadyConfigured
 
     _LOGGER.debug("Attempting to connect to %s", data[CONF_HOST])
-    spa = BalboaSpaWifi(data[CONF_HOST])
-    connected = await spa.connect()
+    spa = BalboaSpaClient(data[CONF_HOST])
+    try:
+        # pybalboa leaves the timeout to the OS, which can take minutes
+        connected = await asyncio.wait_for(spa.connect(), CONNECT_TIMEOUT)
+    except asyncio.TimeoutError:
+        connected = False
     _LOGGER.debug("Got connected = %d", connected)
     if not connected:
         raise CannotConnect
-    await spa.disconnect()
+    try:
+        identified = await asyncio.wait_for(spa.async_identify(), IDENTIFY_TIMEOUT)
+    except asyncio.TimeoutError:
+        identified = False
+    except Exception:
+        await spa.disconnect()
+        raise
+    if not identified:
+        await spa.disconnect()
+        raise CannotConnect
+
+    return {"title": data[CONF_NAME], "spa": spa}
+
+
+@callback
+def _async_hand_over(hass, spa):
+    """Leave a connected spa for the setup of its new entry to take over.
+
+    It is disconnected if no setup has taken it after a while.
+    """
+    probes = hass.data.setdefault(PROBES, {})
+    probes[spa.host] = spa
 
-    return {"title": data[CONF_NAME]}
+    @callback
+    def _async_drop(_now):
+        if probes.get(spa.host) is spa:
+            del probes[spa.host]
+            hass.async_create_task(spa.disconnect())
+
+    async_call_later(hass, PROBE_HANDOFF_TIMEOUT, _async_drop)
 
 
 class BalboaSpaClientFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
@@ -37,6 +97,10 @@ class BalboaSpaClientFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_PUSH
 
+    def __init__(self):
+        """Initialize the flow."""
+        self._discovered = None
+
     @staticmethod
     @callback
     def async_get_options_flow(config_entry):
@@ -44,12 +108,50 @@ class BalboaSpaClientFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         return BalboaSpaClientOptionsFlowHandler(config_entry)
 
     async def async_step_user(self, user_input=None):
-        """Handle a flow initialized by the user."""
+        """Handle a flow initialized by the user.
+
+        Spas found on the network are offered first, if there are any that
+        are not configured yet.
+        """
+        if user_input is None and self._discovered is None:
+            configured = set()
+            for entry in self.hass.config_entries.async_entries(DOMAIN):
+                configured.update((entry.data[CONF_HOST], entry.unique_id))
+            configured.discard(None)
+            self._discovered = {
+                host: macaddr
+                for host, macaddr in (await async_discover_spas()).items()
+                if host not in configured and macaddr not in configured
+            }
+            if self._discovered:
+                return await self.async_step_pick()
+
+        return await self._async_step_connect("user", DATA_SCHEMA, user_input)
+
+    async def async_step_pick(self, user_input=None):
+        """Let the user choose one of the discovered spas."""
+        if user_input is not None and user_input[CONF_HOST] == MANUAL_ENTRY:
+            return await self.async_step_user()
+
+        hosts = {
+            host: f"{host} ({macaddr})" if macaddr else host
+            for host, macaddr in self._discovered.items()
+        }
+        hosts[MANUAL_ENTRY] = "Enter an address"
+        data_schema = vol.Schema(
+            {
+                vol.Required(CONF_HOST, default=next(iter(hosts))): vol.In(hosts),
+                vol.Required(CONF_NAME, default="Spa"): str,
+            }
+        )
+        return await self._async_step_connect("pick", data_schema, user_input)
+
+    async def _async_step_connect(self, step_id, data_schema, user_input):
+        """Create the entry if the spa in user_input can be reached."""
         errors = {}
         if user_input is not None:
             try:
                 info = await validate_input(self.hass, user_input)
-                return self.async_create_entry(title=info["title"], data=user_input)
             except AlreadyConfigured:
                 return self.async_abort(reason="already_configured")
             except CannotConnect:
@@ -57,11 +159,29 @@ class BalboaSpaClientFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
             except Exception:  # pylint: disable=broad-except
                 _LOGGER.exception("Unexpected exception")
                 errors["base"] = "unknown"
+            else:
+                return await self._async_create_entry(info, user_input)
 
         return self.async_show_form(
-            step_id="user", data_schema=DATA_SCHEMA, errors=errors
+            step_id=step_id, data_schema=data_schema, errors=errors
         )
 
+    async def _async_create_entry(self, info, user_input):
+        """Create the entry for an identified spa, unless it already has one.
+
+        The probe connection is closed if the flow aborts, either because the
+        spa is configured or because another flow is already adding it.
+        """
+        spa = info["spa"]
+        try:
+            await self.async_set_unique_id(spa.get_macaddr())
+            self._abort_if_unique_id_configured()
+        except AbortFlow:
+            await spa.disconnect()
+            raise
+        _async_hand_over(self.hass, spa)
+        return self.async_create_entry(title=info["title"], data=user_input)
+
 
 class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
@@ -93,6 +213,46 @@ class BalboaSpaClientOptionsFlowHandler(config_entries.OptionsFlow):
                         CONF_SYNC_TIME,
                         default=self.config_entry.options.get(CONF_SYNC_TIME, False),
                     ): bool,
+                    vol.Optional(
+                        CONF_PUBLISH_INTERVAL,
+                        default=self.config_entry.options.get(
+                            CONF_PUBLISH_INTERVAL, DEFAULT_PUBLISH_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                    vol.Optional(
+                        CONF_OPTIMISTIC_WINDOW,
+                        default=self.config_entry.options.get(
+                            CONF_OPTIMISTIC_WINDOW, DEFAULT_OPTIMISTIC_WINDOW
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=60)),
+                    vol.Optional(
+                        CONF_DIAGNOSTICS,
+                        default=self.config_entry.options.get(
+                            CONF_DIAGNOSTICS, DEFAULT_DIAGNOSTICS
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_PROFILE,
+                        default=self.config_entry.options.get(
+                            CONF_PROFILE, DEFAULT_PROFILE
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_RECORD_FRAMES,
+                        default=self.config_entry.options.get(
+                            CONF_RECORD_FRAMES, DEFAULT_RECORD_FRAMES
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_TEMPERATURE_WINDOWS,
+                        default=self.config_entry.options.get(
+                            CONF_TEMPERATURE_WINDOWS, DEFAULT_TEMPERATURE_WINDOWS
+                        ),
+                    ): vol.All(
+                        str,
+                        vol.Replace(r"\s+", ""),
+                        vol.Match(r"^([1-9][0-9]{0,4}(,[1-9][0-9]{0,4})*)?$"),
+                    ),
                 }
             ),
         )
@@ -1,11 +1,13 @@
 """Constants for the Balboa Spa Client integration."""
 import logging
+from datetime import timedelta
 
 from homeassistant.components.climate.const import (
     FAN_HIGH,
     FAN_LOW,
     FAN_MEDIUM,
     FAN_OFF,
+    HVAC_MODE_AUTO,
     HVAC_MODE_HEAT,
     HVAC_MODE_OFF,
 )
@@ -17,12 +19,107 @@ DOMAIN = "balboa"
 
 CLIMATE_SUPPORTED_FANSTATES = [FAN_OFF, FAN_LOW, FAN_MEDIUM, FAN_HIGH]
 CLIMATE_SUPPORTED_MODES = [HVAC_MODE_HEAT, HVAC_MODE_OFF]
+CLIMATE_SUPPORTED_MODES_RNR = [*CLIMATE_SUPPORTED_MODES, HVAC_MODE_AUTO]
+COMMANDS = "commands"
+COMMAND_CONFIRM_TIMEOUT = 5
+COMMAND_FLUSH_WINDOW = 10
+COMMAND_LATENCY_SAMPLES = 100
+COMMAND_RETRIES = 2
+COMMAND_TOGGLE_INTERVAL = 1
+# Cached configuration keys that determine which entities a spa has
+CONFIG_ENTITY_KEYS = (
+    "pump_array",
+    "light_array",
+    "aux_array",
+    "blower",
+    "mister",
+    "circ_pump",
+    "macaddr",
+)
+# Seconds to wait for the system information and setup parameters before
+# caching the configuration without them
+CONFIG_PAGES_TIMEOUT = 5
+CONF_DIAGNOSTICS = "diagnostics"
+CONF_OPTIMISTIC_WINDOW = "optimistic_window"
+CONF_PROFILE = "profile"
+CONF_PUBLISH_INTERVAL = "publish_interval"
+CONF_RECORD_FRAMES = "record_frames"
 CONF_SYNC_TIME = "sync_time"
+CONF_TEMPERATURE_WINDOWS = "temperature_windows"
+CONNECTION_CHECK_INTERVAL = timedelta(seconds=1)
+CONNECT_TIMEOUT = 5
+DEFAULT_DIAGNOSTICS = False
+DEFAULT_OPTIMISTIC_WINDOW = 0
+DEFAULT_PROFILE = False
+DEFAULT_PROFILE_FILENAME = "balboa_profile.json"
+DEFAULT_PUBLISH_INTERVAL = 0
+DEFAULT_RECORD_FRAMES = False
 DEFAULT_SYNC_TIME = False
+DEFAULT_TEMPERATURE_WINDOWS = ""
+DIAGNOSTICS = "diagnostics"
+DIAGNOSTICS_INTERVAL = timedelta(seconds=30)
+DISCOVERY_PORT = 30303
+DISCOVERY_TIMEOUT = 1
+DISPATCHES = "dispatches"
+EVENT_CHANGE = f"{DOMAIN}_change"
+EVENT_STARTUP = f"{DOMAIN}_startup"
 FAN_SUPPORTED_SPEEDS = [SPEED_OFF, SPEED_LOW, SPEED_HIGH]
-PLATFORMS = ["binary_sensor", "climate", "fan", "switch"]
+HEATING_RATE_SMOOTHING = 0.2
+HEATING_SAVE_DELAY = 60
+HEATING_STORAGE_KEY = f"{DOMAIN}.{{}}.heating"
+IDENTIFY_TIMEOUT = 5
+PLATFORMS = ["binary_sensor", "climate", "fan", "sensor", "switch"]
+PROBES = f"{DOMAIN}_probes"
+PROBE_CONCURRENCY = 128
+PROBE_HANDOFF_TIMEOUT = 60
+PROBE_TIMEOUT = 0.5
+PROFILER = "profiler"
+PROFILE_SAMPLES = 2000
+QUERY_INTERVAL = 0.25
+QUERY_TIMEOUT = 5
+QUERY_TTL = 300
+RECONNECT_BACKOFF_MAX = 300
+RECONNECT_BACKOFF_MIN = 2
+RECORDER_FILENAME = "balboa_{}.frames"
+RECORDER_SIZE = 1024 * 1024
+SCENES = "scenes"
+SCENE_CHANGES = "scene_changes"
+SERVICE_APPLY_SCENE = "apply_scene"
+SERVICE_DUMP_PROFILE = "dump_profile"
+SETUP_START = "setup_start"
+SIGNAL_CONFIG = f"{DOMAIN}_config_{{}}"
+SIGNAL_UPDATE = f"{DOMAIN}_update_{{}}"
 SPA = "spa"
+STALE_TIMEOUT = 300
+STATUS = "status"
+STORAGE_KEY = f"{DOMAIN}.{{}}"
+STORAGE_VERSION = 1
+SUPERVISOR = "supervisor"
+TEMPERATURE_STATS_INTERVAL = timedelta(minutes=1)
+TEMPERATURE_WINDOWS = "temperature_windows"
+TIMINGS = "timings"
+TIME_SYNCED = "time_synced"
+TIME_SYNC_RETRY = 300
+TIME_SYNC_THRESHOLD = 2
+# Smallest change in minutes worth writing the time to target for
+TIME_TO_TARGET_STEP = 5
 UNSUB = "unsub"
+WATCHDOG_MIN_TIMEOUT = 3
+WATCHDOG_MISSED_FRAMES = 5
+WATCHDOG_SMOOTHING = 0.1
+
+PHASE_CONFIGURED = "configured"
+PHASE_CONNECT = "connect"
+PHASE_FIRST_STATE = "first_state"
+PHASE_IDENT = "ident"
+PHASE_PLATFORMS = "platforms"
+STARTUP_PHASES = (
+    PHASE_CONNECT,
+    PHASE_IDENT,
+    PHASE_CONFIGURED,
+    PHASE_PLATFORMS,
+    PHASE_FIRST_STATE,
+)
 
 AUX = "Aux"
 CIRC_PUMP = "Circ Pump"
@@ -32,3 +129,63 @@ LIGHT = "Light"
 MISTER = "Mister"
 PUMP = "Pump"
 TEMP_RANGE = "Temp Range"
+TIME_TO_TARGET = "Time to Target"
+
+COMMAND_LATENCY = "Command Latency"
+DECODE_ERRORS = "Decode Errors"
+FANOUT = "Fan-out"
+FRAME_AGE = "Last Frame Age"
+FRAME_RATE = "Frame Rate"
+RECONNECTS = "Reconnects"
+DIAGNOSTIC_SENSORS = (
+    FRAME_RATE,
+    DECODE_ERRORS,
+    RECONNECTS,
+    FRAME_AGE,
+    FANOUT,
+    COMMAND_LATENCY,
+)
+
+TEMP_MAX = "Temp Max"
+TEMP_MEAN = "Temp Mean"
+TEMP_MIN = "Temp Min"
+TEMP_RATE = "Temp Rate"
+# In the order RollingStats.stats returns them
+TEMPERATURE_STATS = (TEMP_MIN, TEMP_MAX, TEMP_MEAN, TEMP_RATE)
+
+STATUS_AUX = "aux"
+STATUS_BLOWER = "blower"
+STATUS_CIRC_PUMP = "circ_pump"
+STATUS_CONNECTED = "connected"
+STATUS_CURTEMP = "curtemp"
+STATUS_FILTER_MODE = "filter_mode"
+STATUS_HEATMODE = "heatmode"
+STATUS_HEATSTATE = "heatstate"
+STATUS_LIGHT = "light"
+STATUS_MISTER = "mister"
+STATUS_PUMP = "pump"
+STATUS_SETTEMP = "settemp"
+STATUS_TEMPRANGE = "temprange"
+STATUS_TEMPSCALE = "tempscale"
+STATUS_TIME = "time"
+STATUS_FIELDS = frozenset(
+    (
+        STATUS_CONNECTED,
+        STATUS_HEATMODE,
+        STATUS_HEATSTATE,
+        STATUS_CURTEMP,
+        STATUS_SETTEMP,
+        STATUS_TEMPRANGE,
+        STATUS_TEMPSCALE,
+        STATUS_FILTER_MODE,
+        STATUS_TIME,
+        *(f"{STATUS_PUMP}{num}" for num in range(1, 7)),
+        *(f"{STATUS_LIGHT}{num}" for num in range(1, 3)),
+        *(f"{STATUS_AUX}{num}" for num in range(1, 3)),
+        STATUS_BLOWER,
+        STATUS_MISTER,
+        STATUS_CIRC_PUMP,
+    )
+)
+# Values that drift continuously and are subject to the publish interval
+THROTTLED_STATUS_FIELDS = frozenset((STATUS_CURTEMP, STATUS_TIME))
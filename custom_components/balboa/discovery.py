@@ -0,0 +1,115 @@
+"""Discovery of Balboa spa Wi-Fi modules on the local network.
+
+The modules answer a UDP broadcast on port 30303 with their name and MAC
+address.  In case broadcasts do not get through, the hosts of the local /24
+network are probed for the spa's TCP port at the same time, a bounded
+number at a time, and the probe results are used if nobody answers the
+broadcast.
+"""
+import asyncio
+import ipaddress
+import socket
+
+from pybalboa.balboa import BALBOA_DEFAULT_PORT
+
+from .const import (
+    _LOGGER,
+    DISCOVERY_PORT,
+    DISCOVERY_TIMEOUT,
+    PROBE_CONCURRENCY,
+    PROBE_TIMEOUT,
+)
+
+DISCOVERY_MESSAGE = b"Discovery: Who is out there?"
+DISCOVERY_NAME = "BWGSPA"
+
+
+class _DiscoveryProtocol(asyncio.DatagramProtocol):
+    """Collect the modules answering a discovery broadcast."""
+
+    def __init__(self):
+        """Initialize with nothing found."""
+        self.found = {}
+
+    def datagram_received(self, data, addr):
+        """Record a module's host and MAC address."""
+        lines = data.decode("ascii", "replace").split()
+        if not lines or lines[0] != DISCOVERY_NAME:
+            return
+        macaddr = lines[1].replace("-", ":").lower() if len(lines) > 1 else None
+        self.found[addr[0]] = macaddr
+
+
+async def async_discover(
+    broadcast="255.255.255.255", port=DISCOVERY_PORT, timeout=DISCOVERY_TIMEOUT
+):
+    """Broadcast for modules and return {host: MAC address} of those answering."""
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        _DiscoveryProtocol, local_addr=("0.0.0.0", 0), allow_broadcast=True
+    )
+    try:
+        transport.sendto(DISCOVERY_MESSAGE, (broadcast, port))
+        await asyncio.sleep(timeout)
+    finally:
+        transport.close()
+    return protocol.found
+
+
+async def async_probe(
+    hosts,
+    port=BALBOA_DEFAULT_PORT,
+    timeout=PROBE_TIMEOUT,
+    concurrency=PROBE_CONCURRENCY,
+):
+    """Return {host: None} for each of hosts accepting connections on port."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _probe(host):
+        async with semaphore:
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, port), timeout
+                )
+            except (OSError, asyncio.TimeoutError):
+                return None
+            writer.close()
+            return host
+
+    found = await asyncio.gather(*(_probe(str(host)) for host in hosts))
+    return {host: None for host in found if host is not None}
+
+
+def local_network():
+    """Return the /24 network of the address used to reach the LAN, if any."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        try:
+            # Connecting a UDP socket picks a source address without sending
+            sock.connect(("10.255.255.255", 1))
+            address = sock.getsockname()[0]
+        except OSError:
+            return None
+    network = ipaddress.ip_network(f"{address}/24", strict=False)
+    if network.is_loopback:
+        return None
+    return network
+
+
+async def async_discover_spas():
+    """Return {host: MAC address or None} of the spas on the local network."""
+    network = local_network()
+    probe = None
+    if network is not None:
+        probe = asyncio.ensure_future(async_probe(network.hosts()))
+    try:
+        found = await async_discover()
+    except OSError as err:
+        _LOGGER.debug("Discovery broadcast failed: %s", err)
+        found = {}
+    if probe is None:
+        return found
+    if found:
+        probe.cancel()
+        return found
+    _LOGGER.debug("No spa answered the broadcast, using the probe of %s", network)
+    return await probe
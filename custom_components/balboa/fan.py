@@ -1,4 +1,6 @@
 """Support for Balboa Spa Pumps."""
+from functools import partial
+
 from homeassistant.components.fan import (
     SPEED_LOW,
     SPEED_OFF,
@@ -7,7 +9,7 @@ from homeassistant.components.fan import (
 )
 
 from . import BalboaEntity
-from .const import _LOGGER, DOMAIN, FAN_SUPPORTED_SPEEDS, PUMP, SPA
+from .const import _LOGGER, DOMAIN, FAN_SUPPORTED_SPEEDS, PUMP, SPA, STATUS_PUMP
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
@@ -19,7 +21,7 @@ async def async_setup_entry(hass, entry, async_add_entities):
         if value:
             devs.append(BalboaSpaPump(hass, entry, key, value))
 
-    async_add_entities(devs, True)
+    async_add_entities(devs)
 
 
 class BalboaSpaPump(BalboaEntity, FanEntity):
@@ -31,11 +33,20 @@ class BalboaSpaPump(BalboaEntity, FanEntity):
         self._speed_list = FAN_SUPPORTED_SPEEDS if states > 1 else None
         self._supported_features = SUPPORT_SET_SPEED if states > 1 else 0
 
+    def _status_fields(self):
+        """Return the status fields this entity's state is built from."""
+        return (f"{STATUS_PUMP}{self._num}",)
+
     async def async_set_speed(self, speed: str) -> None:
         """Set speed of pump."""
         setto = FAN_SUPPORTED_SPEEDS.index(speed)
-        _LOGGER.debug(f"set {self.name} speed to {speed}")
-        await self._client.change_pump(self._num - 1, setto)
+        _LOGGER.debug("set %s speed to %s", self.name, speed)
+        await self._async_send_command(
+            f"{STATUS_PUMP}{self._num}",
+            partial(self._client.change_pump, self._num - 1, setto),
+            lambda status: status.pump[self._num - 1] == setto,
+            overlay=lambda status: status.replace_item("pump", self._num - 1, setto),
+        )
 
     async def async_turn_on(self, speed: str = None, **kwargs) -> None:
         """Turn on pump."""
@@ -60,8 +71,7 @@ class BalboaSpaPump(BalboaEntity, FanEntity):
     @property
     def speed(self) -> str:
         """Return the current speed."""
-        pstate = self._client.get_pump(self._num - 1)
-        _LOGGER.debug(f"{self.name} speed is {FAN_SUPPORTED_SPEEDS[pstate]}")
+        pstate = self._status.pump[self._num - 1]
         if pstate >= len(FAN_SUPPORTED_SPEEDS) or pstate < 0:
             return SPEED_OFF
         return FAN_SUPPORTED_SPEEDS[pstate]
@@ -69,7 +79,7 @@ class BalboaSpaPump(BalboaEntity, FanEntity):
     @property
     def is_on(self):
         """Return true if the pump is on."""
-        pstate = self._client.get_pump(self._num - 1)
+        pstate = self._status.pump[self._num - 1]
         return bool(pstate)
 
     @property
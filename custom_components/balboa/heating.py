@@ -0,0 +1,68 @@
+"""Online model of how fast a spa's heater warms the water."""
+from .const import HEATING_RATE_SMOOTHING
+
+
+class HeatingModel:
+    """Learn the heating rate from temperature steps while the heater is on.
+
+    Temperatures are in Fahrenheit, whatever the spa displays, so that what
+    is learned survives a change of temperature scale.  The rate is only
+    measured between two steps of the same on-period: the first step after
+    the heater comes on marks where measuring starts, since the water was
+    already part way to it.  Each measurement moves the rate, in degrees
+    per hour, a fixed fraction of the way towards it.
+    """
+
+    def __init__(self, rate=None, samples=0):
+        """Initialize the model, with a previously learned rate if any."""
+        self.rate = rate
+        self.samples = samples
+        self._heating = False
+        self._anchor = None
+
+    def observe(self, now, temp, heating):
+        """Take in the temperature at monotonic time now.
+
+        A temperature of None, sent while the spa has no reading, is
+        skipped.  Returns whether the rate changed.
+        """
+        if temp is None:
+            return False
+        if not heating:
+            self._heating = False
+            self._anchor = None
+            return False
+        if not self._heating:
+            self._heating = True
+            self._anchor = (None, temp)
+            return False
+        anchor_time, anchor_temp = self._anchor
+        if temp == anchor_temp:
+            return False
+        self._anchor = (now, temp)
+        if anchor_time is None or temp < anchor_temp:
+            return False
+        rate = (temp - anchor_temp) * 3600 / (now - anchor_time)
+        if self.rate is None:
+            self.rate = rate
+        else:
+            self.rate += HEATING_RATE_SMOOTHING * (rate - self.rate)
+        self.samples += 1
+        return True
+
+    def minutes_to(self, temp, target):
+        """Return the minutes the heater needs to go from temp to target.
+
+        Returns None if the rate or the temperature is not known.
+        """
+        if temp is None:
+            return None
+        if temp >= target:
+            return 0
+        if not self.rate or self.rate <= 0:
+            return None
+        return (target - temp) * 60 / self.rate
+
+    def as_dict(self):
+        """Return what has been learned, to be stored."""
+        return {"rate": self.rate, "samples": self.samples}
@@ -0,0 +1,66 @@
+"""Hot path profiling for a Balboa spa connection."""
+import time
+from collections import deque
+
+from .const import PROFILE_SAMPLES
+
+
+class Profiler:
+    """Bounded record of where time goes per status frame.
+
+    Nothing is recorded unless enabled, and callers check enabled before
+    doing any timing work of their own, so the profiler costs one attribute
+    read per frame and per entity callback while it is off.
+    """
+
+    def __init__(self):
+        """Initialize the profiler, disabled."""
+        self.enabled = False
+        self.frames = deque(maxlen=PROFILE_SAMPLES)
+        self.callbacks = deque(maxlen=PROFILE_SAMPLES)
+
+    def record_frame(self, duration, changed):
+        """Record the time taken to snapshot and dispatch one status frame."""
+        self.frames.append((time.time(), duration, changed))
+
+    def record_callback(self, entity_id, duration, reads):
+        """Record one entity update callback and its status reads."""
+        self.callbacks.append((time.time(), entity_id, duration, reads))
+
+    def as_dict(self):
+        """Return the recorded samples, durations in microseconds."""
+        return {
+            "frames": [
+                {
+                    "time": timestamp,
+                    "duration_us": round(duration * 1e6, 1),
+                    "changed": sorted(changed),
+                }
+                for timestamp, duration, changed in self.frames
+            ],
+            "callbacks": [
+                {
+                    "time": timestamp,
+                    "entity_id": entity_id,
+                    "duration_us": round(duration * 1e6, 1),
+                    "status_reads": reads,
+                }
+                for timestamp, entity_id, duration, reads in self.callbacks
+            ],
+        }
+
+
+class CountingStatus:
+    """Stand-in for a SpaStatus that counts the fields read from it."""
+
+    __slots__ = ("_status", "reads")
+
+    def __init__(self, status):
+        """Wrap status."""
+        self._status = status
+        self.reads = 0
+
+    def __getattr__(self, name):
+        """Count and forward a field read."""
+        self.reads += 1
+        return getattr(self._status, name)
@@ -0,0 +1,128 @@
+"""Raw frame recorder for a Balboa spa connection.
+
+Frames are kept in a fixed-size file, mapped into memory, that is used as a
+ring buffer: once it is full the oldest frames are overwritten.  The file
+starts with a header:
+
+    magic (8 bytes), version (u16), reserved (u16), capacity (u32),
+    head (u32), tail (u32), end (u32), records (u32)
+
+followed by capacity bytes of records, each a timestamp (f64, seconds since
+the epoch) and a length (u16) followed by the frame.  Records run from tail
+to head; when they wrap around, the ones from tail run up to end, where
+the writer wrapped, and continue from the start of the data.  All integers
+are little endian.
+"""
+import mmap
+import os
+import struct
+import time
+
+HEADER = struct.Struct("<8sHHIIIII")
+MAGIC = b"BALBOAFR"
+RECORD = struct.Struct("<dH")
+VERSION = 1
+
+
+class FrameRecorder:
+    """Append frames to a memory-mapped ring file.
+
+    Recording a frame packs straight into the mapping, so it allocates
+    nothing per frame beyond its timestamp.
+    """
+
+    def __init__(self, path, capacity):
+        """Open or create the ring file at path.
+
+        Frames already in an existing file of the same capacity are kept.
+        This does blocking file I/O.
+        """
+        self.path = path
+        self.capacity = capacity
+        size = HEADER.size + capacity
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        magic, version, _, stored, head, tail, end, records = HEADER.unpack_from(
+            self._map
+        )
+        if magic == MAGIC and version == VERSION and stored == capacity:
+            self._head, self._tail, self._end, self._records = head, tail, end, records
+        else:
+            self._head, self._tail, self._end, self._records = 0, 0, self.capacity, 0
+            self._write_header()
+
+    def record(self, frame):
+        """Append one frame, dropping the oldest ones to make room."""
+        size = RECORD.size + len(frame)
+        if size > self.capacity:
+            return
+        if self._head + size > self.capacity:
+            # Drop the records after head and wrap around
+            while self._records and self._tail >= self._head:
+                self._drop_oldest()
+            self._end = self._head
+            self._head = 0
+            if not self._records:
+                self._tail = 0
+        while self._records and self._head <= self._tail < self._head + size:
+            self._drop_oldest()
+        offset = HEADER.size + self._head
+        RECORD.pack_into(self._map, offset, time.time(), len(frame))
+        self._map[offset + RECORD.size : offset + size] = frame
+        self._head += size
+        self._records += 1
+        self._write_header()
+
+    def _drop_oldest(self):
+        """Forget the oldest record."""
+        _, length = RECORD.unpack_from(self._map, HEADER.size + self._tail)
+        self._tail += RECORD.size + length
+        self._records -= 1
+        if self._tail >= self._end:
+            self._tail = 0
+            self._end = self.capacity
+        if not self._records:
+            self._tail = self._head
+
+    def _write_header(self):
+        """Store the ring positions in the file header."""
+        HEADER.pack_into(
+            self._map,
+            0,
+            MAGIC,
+            VERSION,
+            0,
+            self.capacity,
+            self._head,
+            self._tail,
+            self._end,
+            self._records,
+        )
+
+    def close(self):
+        """Flush and unmap the file."""
+        self._map.flush()
+        self._map.close()
+
+
+def read_frames(path):
+    """Yield (timestamp, frame) for each record in a ring file, oldest first."""
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version, _, _, _, tail, end, records = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a Balboa frame recording")
+    offset = tail
+    for _ in range(records):
+        if offset >= end:
+            offset = 0
+        timestamp, length = RECORD.unpack_from(data, HEADER.size + offset)
+        start = HEADER.size + offset + RECORD.size
+        yield timestamp, data[start : start + length]
+        offset += RECORD.size + length
@@ -0,0 +1,97 @@
+"""Rolling statistics over a time window, updated incrementally."""
+import time
+from collections import deque
+
+
+class RollingStats:
+    """Min, max, mean and rate of change of a value over a sliding window.
+
+    The value is taken to hold from each sample until the next, so the mean
+    is weighted by time rather than by the number of samples.  Samples
+    repeating the previous value are dropped.  Adding a sample and reading
+    the statistics take amortized constant time however many samples the
+    window holds: the minimum and maximum come from monotonic queues and
+    the mean from a running area under the samples.
+    """
+
+    def __init__(self, window):
+        """Initialize the statistics over the last window seconds."""
+        self.window = window
+        self._samples = deque()
+        self._min = deque()
+        self._max = deque()
+        self._area = 0.0
+        self._seq = 0
+
+    def clear(self):
+        """Forget every sample."""
+        self._samples.clear()
+        self._min.clear()
+        self._max.clear()
+        self._area = 0.0
+
+    def add(self, value, now=None):
+        """Record that the value changed to value."""
+        samples = self._samples
+        if samples and samples[-1][1] == value:
+            return
+        if now is None:
+            now = time.monotonic()
+        if samples:
+            last_time, last_value, _ = samples[-1]
+            self._area += last_value * (now - last_time)
+        self._seq += 1
+        sample = (now, value, self._seq)
+        samples.append(sample)
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append(sample)
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append(sample)
+        self._expire(now)
+
+    def _expire(self, now):
+        """Drop the samples that were replaced before the window started."""
+        samples = self._samples
+        start = now - self.window
+        while len(samples) > 1 and samples[1][0] <= start:
+            sample_time, value, _ = samples.popleft()
+            self._area -= value * (samples[0][0] - sample_time)
+        if len(samples) == 1:
+            # Nothing left to subtract from, so drop any rounding error
+            self._area = 0.0
+        oldest = samples[0][2]
+        while self._min[0][2] < oldest:
+            self._min.popleft()
+        while self._max[0][2] < oldest:
+            self._max.popleft()
+
+    def stats(self, now=None):
+        """Return (min, max, mean, change per hour), or None with no samples.
+
+        The window is cut short when there is less history than it spans.
+        """
+        samples = self._samples
+        if not samples:
+            return None
+        if now is None:
+            now = time.monotonic()
+        self._expire(now)
+        first_time, first_value, _ = samples[0]
+        last_time, last_value, _ = samples[-1]
+        begin = max(first_time, now - self.window)
+        elapsed = now - begin
+        if elapsed <= 0:
+            return last_value, last_value, last_value, 0.0
+        area = (
+            self._area
+            - first_value * (begin - first_time)
+            + last_value * (now - last_time)
+        )
+        return (
+            self._min[0][1],
+            self._max[0][1],
+            area / elapsed,
+            (last_value - first_value) * 3600 / elapsed,
+        )
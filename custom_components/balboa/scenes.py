@@ -0,0 +1,244 @@
+"""Apply a whole desired state to a Balboa spa in one go.
+
+A scene names the state wanted for any of the pumps, lights, aux outputs,
+mister, blower, temperature range, heat mode and set temperature.  Only the
+controls not already in that state get a command, all commands are queued
+together so the command queue paces the button presses, and the entities
+publish once when the spa has confirmed the lot instead of after every
+press.
+"""
+import asyncio
+import math
+from functools import partial
+
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+from homeassistant.const import ATTR_ENTITY_ID, TEMP_CELSIUS, TEMP_FAHRENHEIT
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.util.temperature import convert as convert_temperature
+
+from .const import (
+    _LOGGER,
+    CLIMATE_SUPPORTED_FANSTATES,
+    COMMANDS,
+    DISPATCHES,
+    DOMAIN,
+    FAN_SUPPORTED_SPEEDS,
+    SCENE_CHANGES,
+    SCENES,
+    SIGNAL_UPDATE,
+    SPA,
+    STATUS,
+    STATUS_AUX,
+    STATUS_BLOWER,
+    STATUS_HEATMODE,
+    STATUS_LIGHT,
+    STATUS_MISTER,
+    STATUS_PUMP,
+    STATUS_SETTEMP,
+    STATUS_TEMPRANGE,
+)
+
+ATTR_BLOWER = "blower"
+ATTR_HEAT_MODE = "heat_mode"
+ATTR_MISTER = "mister"
+ATTR_TEMPERATURE = "temperature"
+ATTR_TEMP_RANGE = "temp_range"
+HEAT_MODES = ["ready", "rest"]
+TEMP_RANGES = ["low", "high"]
+
+PUMPS = [f"pump{num}" for num in range(1, 7)]
+LIGHTS = [f"light{num}" for num in range(1, 3)]
+AUXES = [f"aux{num}" for num in range(1, 3)]
+SCENE_ATTRS = [
+    *PUMPS,
+    *LIGHTS,
+    *AUXES,
+    ATTR_MISTER,
+    ATTR_BLOWER,
+    ATTR_TEMP_RANGE,
+    ATTR_HEAT_MODE,
+    ATTR_TEMPERATURE,
+]
+
+APPLY_SCENE_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+            **{vol.Optional(pump): vol.In(FAN_SUPPORTED_SPEEDS) for pump in PUMPS},
+            **{vol.Optional(light): cv.boolean for light in LIGHTS},
+            **{vol.Optional(aux): cv.boolean for aux in AUXES},
+            vol.Optional(ATTR_MISTER): cv.boolean,
+            vol.Optional(ATTR_BLOWER): vol.In(CLIMATE_SUPPORTED_FANSTATES),
+            vol.Optional(ATTR_TEMP_RANGE): vol.In(TEMP_RANGES),
+            vol.Optional(ATTR_HEAT_MODE): vol.In(HEAT_MODES),
+            vol.Optional(ATTR_TEMPERATURE): vol.Coerce(float),
+        }
+    ),
+    cv.has_at_least_one_key(*SCENE_ATTRS),
+)
+
+
+async def async_scene_entries(hass, entity_ids):
+    """Return the IDs of the spa entries owning entity_ids, or of all spas."""
+    if entity_ids is None:
+        return list(hass.data[DOMAIN])
+    registry = await entity_registry.async_get_registry(hass)
+    entry_ids = []
+    for entity_id in entity_ids:
+        entity = registry.async_get(entity_id)
+        if entity is None or entity.config_entry_id not in hass.data[DOMAIN]:
+            raise HomeAssistantError(f"{entity_id} is not a Balboa spa entity")
+        if entity.config_entry_id not in entry_ids:
+            entry_ids.append(entity.config_entry_id)
+    return entry_ids
+
+
+def scene_commands(hass, spa, status, scene):
+    """Return the (key, send, applied, toggle) commands a scene needs.
+
+    Controls already in the requested state, and those the spa does not
+    have, get no command.  The temperature range comes first, since the
+    set temperature is checked against the limits of the current range.
+    """
+    commands = []
+
+    def _add(key, send, applied, toggle=True):
+        if not applied(status):
+            commands.append((key, send, applied, toggle))
+
+    temprange = status.temprange
+    if ATTR_TEMP_RANGE in scene:
+        temprange = TEMP_RANGES.index(scene[ATTR_TEMP_RANGE])
+        _add(
+            STATUS_TEMPRANGE,
+            partial(spa.change_temprange, temprange),
+            lambda status: status.temprange == temprange,
+        )
+    if ATTR_HEAT_MODE in scene:
+        heatmode = (
+            spa.HEATMODE_READY
+            if scene[ATTR_HEAT_MODE] == HEAT_MODES[0]
+            else spa.HEATMODE_REST
+        )
+        _add(
+            STATUS_HEATMODE,
+            partial(spa.change_heatmode, heatmode),
+            lambda status: status.heatmode == heatmode,
+        )
+    if ATTR_TEMPERATURE in scene:
+        temperature = _spa_temperature(hass, spa, status, scene[ATTR_TEMPERATURE])
+        tmin = spa.tmin[temprange][status.tempscale]
+        tmax = spa.tmax[temprange][status.tempscale]
+        if not tmin <= temperature <= tmax:
+            raise HomeAssistantError(
+                f"Temperature {temperature} is outside the spa's range "
+                f"of {tmin} to {tmax}"
+            )
+        _add(
+            STATUS_SETTEMP,
+            partial(spa.send_temp_change, temperature),
+            lambda status: status.settemp == temperature,
+            toggle=False,
+        )
+    for num, pump in enumerate(PUMPS):
+        if pump not in scene or not _has(spa, spa.pump_array, num, pump):
+            continue
+        speed = FAN_SUPPORTED_SPEEDS.index(scene[pump])
+        if speed > spa.pump_array[num]:
+            speed = spa.pump_array[num]
+        _add(
+            f"{STATUS_PUMP}{num + 1}",
+            partial(spa.change_pump, num, speed),
+            lambda status, num=num, speed=speed: status.pump[num] == speed,
+        )
+    for num, light in enumerate(LIGHTS):
+        if light not in scene or not _has(spa, spa.light_array, num, light):
+            continue
+        state = spa.ON if scene[light] else spa.OFF
+        _add(
+            f"{STATUS_LIGHT}{num + 1}",
+            partial(spa.change_light, num, state),
+            lambda status, num=num, state=state: bool(status.light[num]) == state,
+        )
+    for num, aux in enumerate(AUXES):
+        if aux not in scene or not _has(spa, spa.aux_array, num, aux):
+            continue
+        state = spa.ON if scene[aux] else spa.OFF
+        _add(
+            f"{STATUS_AUX}{num + 1}",
+            partial(spa.change_aux, num, state),
+            # aux states are reported as bit masks rather than 0 or 1
+            lambda status, num=num, state=state: bool(status.aux[num]) == state,
+        )
+    if ATTR_MISTER in scene and spa.have_mister():
+        mister = spa.ON if scene[ATTR_MISTER] else spa.OFF
+        _add(
+            STATUS_MISTER,
+            partial(spa.change_mister, mister),
+            lambda status: bool(status.mister) == mister,
+        )
+    if ATTR_BLOWER in scene and spa.have_blower():
+        blower = CLIMATE_SUPPORTED_FANSTATES.index(scene[ATTR_BLOWER])
+        _add(
+            STATUS_BLOWER,
+            partial(spa.change_blower, blower),
+            lambda status: status.blower == blower,
+        )
+    return commands
+
+
+def _has(spa, array, num, name):
+    """Return whether the spa has an item of an equipment array."""
+    if array[num]:
+        return True
+    _LOGGER.debug("Spa has no %s, ignoring it in the scene", name)
+    return False
+
+
+def _spa_temperature(hass, spa, status, temperature):
+    """Convert a temperature in the system unit to the spa's scale."""
+    if status.tempscale == spa.TSCALE_C:
+        temperature = convert_temperature(
+            temperature, hass.config.units.temperature_unit, TEMP_CELSIUS
+        )
+        return 0.5 * round(temperature / 0.5)
+    temperature = convert_temperature(
+        temperature, hass.config.units.temperature_unit, TEMP_FAHRENHEIT
+    )
+    return math.floor(temperature + 0.5)
+
+
+async def async_apply_scene(hass, entry_id, scene):
+    """Bring a spa to the state of a scene and publish it once confirmed.
+
+    Status changes are held back from the entities while the commands run
+    and are dispatched together at the end.  Returns whether the spa
+    confirmed every command.
+    """
+    entry_data = hass.data[DOMAIN][entry_id]
+    commands = scene_commands(hass, entry_data[SPA], entry_data[STATUS], scene)
+    if not commands:
+        return True
+    _LOGGER.debug("Applying scene with %d commands", len(commands))
+    queue = entry_data[COMMANDS]
+    entry_data[SCENES] += 1
+    try:
+        results = await asyncio.gather(
+            *(queue.async_submit(*command) for command in commands)
+        )
+    finally:
+        entry_data[SCENES] -= 1
+        held = entry_data[SCENE_CHANGES]
+        if not entry_data[SCENES] and held:
+            changed = set(held)
+            held.clear()
+            entry_data[DISPATCHES] += 1
+            async_dispatcher_send(
+                hass, SIGNAL_UPDATE.format(entry_id), entry_data[STATUS], changed
+            )
+    if not all(results):
+        _LOGGER.warning("Spa did not confirm every command of the scene")
+    return all(results)
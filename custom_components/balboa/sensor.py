@@ -0,0 +1,349 @@
+"""Support for Balboa Spa temperature and diagnostic sensors."""
+import math
+import time
+
+from homeassistant.const import (
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+    TEMP_CELSIUS,
+    TEMP_FAHRENHEIT,
+    TIME_MILLISECONDS,
+    TIME_MINUTES,
+    TIME_SECONDS,
+)
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.helpers.storage import Store
+
+from . import BalboaEntity
+from .const import (
+    COMMAND_LATENCY,
+    COMMANDS,
+    CONF_DIAGNOSTICS,
+    CONF_TEMPERATURE_WINDOWS,
+    DECODE_ERRORS,
+    DEFAULT_DIAGNOSTICS,
+    DEFAULT_TEMPERATURE_WINDOWS,
+    DIAGNOSTIC_SENSORS,
+    DIAGNOSTICS_INTERVAL,
+    DISPATCHES,
+    FANOUT,
+    FRAME_AGE,
+    FRAME_RATE,
+    HEATING_SAVE_DELAY,
+    HEATING_STORAGE_KEY,
+    RECONNECTS,
+    STATUS_CONNECTED,
+    STATUS_CURTEMP,
+    STATUS_HEATSTATE,
+    STATUS_SETTEMP,
+    STATUS_TEMPSCALE,
+    STORAGE_VERSION,
+    SUPERVISOR,
+    TEMP_RATE,
+    TEMPERATURE_STATS,
+    TEMPERATURE_STATS_INTERVAL,
+    TIME_TO_TARGET,
+    TIME_TO_TARGET_STEP,
+)
+from .heating import HeatingModel
+from .rolling import RollingStats
+
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Set up the spa's sensors."""
+    devs = [BalboaSpaTimeToTargetSensor(hass, entry, TIME_TO_TARGET)]
+    windows = entry.options.get(CONF_TEMPERATURE_WINDOWS, DEFAULT_TEMPERATURE_WINDOWS)
+    for window in sorted({int(minutes) for minutes in windows.split(",") if minutes}):
+        # The sensors for one window share their statistics
+        stats = RollingStats(window * 60)
+        for stat in TEMPERATURE_STATS:
+            devs.append(BalboaSpaTemperatureSensor(hass, entry, stat, window, stats))
+
+    if entry.options.get(CONF_DIAGNOSTICS, DEFAULT_DIAGNOSTICS):
+        for type in DIAGNOSTIC_SENSORS:
+            devs.append(BalboaSpaDiagnosticSensor(hass, entry, type))
+
+    async_add_entities(devs)
+
+
+def _percentile(ordered, percent):
+    """Return the nearest-rank percentile of an ordered list."""
+    return ordered[max(math.ceil(len(ordered) * percent / 100) - 1, 0)]
+
+
+class BalboaSpaDiagnosticSensor(BalboaEntity):
+    """Representation of a Balboa Spa link health sensor.
+
+    These sample counters kept by the client, supervisor and command queue
+    every DIAGNOSTICS_INTERVAL rather than following the status stream.
+    """
+
+    def __init__(self, hass, entry, type):
+        """Initialize the sensor."""
+        super().__init__(hass, entry, type)
+        self._state = None
+        self._attributes = None
+        self._last_frames = self._client.frames
+        self._last_sample = time.monotonic()
+
+    async def async_added_to_hass(self) -> None:
+        """Start sampling."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_track_time_interval(self.hass, self._sample, DIAGNOSTICS_INTERVAL)
+        )
+
+    @callback
+    def _sample(self, _now) -> None:
+        """Read the counter this sensor reports and write its state."""
+        entry_data = self._entry_data
+        if self._type == FRAME_RATE:
+            now = time.monotonic()
+            frames = self._client.frames
+            self._state = round(
+                (frames - self._last_frames) / (now - self._last_sample), 2
+            )
+            self._last_frames = frames
+            self._last_sample = now
+        elif self._type == DECODE_ERRORS:
+            self._state = self._client.decode_errors
+        elif self._type == RECONNECTS:
+            self._state = entry_data[SUPERVISOR].reconnects
+        elif self._type == FRAME_AGE:
+            lastupd = self._client.lastupd
+            # lastupd is 0 until the first frame arrives
+            self._state = round(time.time() - lastupd, 1) if lastupd else None
+        elif self._type == FANOUT:
+            self._state = entry_data[DISPATCHES]
+        elif self._type == COMMAND_LATENCY:
+            latencies = sorted(entry_data[COMMANDS].latencies)
+            if latencies:
+                self._state = round(_percentile(latencies, 50) * 1000)
+                self._attributes = {
+                    "p95": round(_percentile(latencies, 95) * 1000),
+                    "p99": round(_percentile(latencies, 99) * 1000),
+                    "samples": len(latencies),
+                }
+        self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        """Return True, link health is reported while disconnected too."""
+        return True
+
+    @property
+    def state(self):
+        """Return the last sampled value."""
+        return self._state
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of the sensor."""
+        if self._type == FRAME_RATE:
+            return "frames/s"
+        if self._type == FRAME_AGE:
+            return TIME_SECONDS
+        if self._type == COMMAND_LATENCY:
+            return TIME_MILLISECONDS
+        return None
+
+    @property
+    def device_state_attributes(self):
+        """Return the command latency percentiles."""
+        return self._attributes
+
+    @property
+    def icon(self):
+        """Return the icon to use in the frontend, if any."""
+        if self._type == DECODE_ERRORS:
+            return "mdi:alert-circle-outline"
+        if self._type == RECONNECTS:
+            return "mdi:lan-disconnect"
+        if self._type in (FRAME_AGE, COMMAND_LATENCY):
+            return "mdi:timer-outline"
+        return "mdi:swap-vertical"
+
+
+class BalboaSpaTemperatureSensor(BalboaEntity, RestoreEntity):
+    """Representation of a rolling statistic of the spa's water temperature.
+
+    Every temperature change goes into the window's statistics as it
+    arrives, but the state is only written every TEMPERATURE_STATS_INTERVAL.
+    The last state is restored on restart and shown until the window has
+    new samples.
+    """
+
+    def __init__(self, hass, entry, stat, window, stats):
+        """Initialize the sensor."""
+        super().__init__(hass, entry, f"{stat} {window}m")
+        self._stat = stat
+        self._stats = stats
+        self._state = None
+
+    def _status_fields(self):
+        """Return the status fields this entity's state is built from."""
+        return (STATUS_CURTEMP, STATUS_TEMPSCALE)
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last state and start publishing."""
+        await super().async_added_to_hass()
+        last_state = await self.async_get_last_state()
+        if last_state is not None and last_state.state not in (
+            STATE_UNKNOWN,
+            STATE_UNAVAILABLE,
+        ):
+            self._state = float(last_state.state)
+        if self._status.connected and self._status.curtemp is not None:
+            self._stats.add(self._status.curtemp)
+        self.async_on_remove(
+            async_track_time_interval(
+                self.hass, self._sample, TEMPERATURE_STATS_INTERVAL
+            )
+        )
+
+    @callback
+    def _handle_update(self, status, changed) -> None:
+        """Add a temperature change to the statistics."""
+        self._status = status
+        if STATUS_TEMPSCALE in changed:
+            # The window would mix units otherwise
+            self._stats.clear()
+        if (
+            status.connected
+            and status.curtemp is not None
+            and not changed.isdisjoint((STATUS_CURTEMP, STATUS_TEMPSCALE))
+        ):
+            # The first of the window's sensors adds the change and the
+            # others see it repeated; the spa reports no temperature while
+            # it has no reading
+            self._stats.add(status.curtemp)
+        if STATUS_CONNECTED in changed:
+            self._publish()
+
+    @callback
+    def _sample(self, _now) -> None:
+        """Read this sensor's statistic and write its state."""
+        stats = self._stats.stats()
+        if stats is not None:
+            value = stats[TEMPERATURE_STATS.index(self._stat)]
+            self._state = round(value, 2)
+        self._publish()
+
+    @property
+    def state(self):
+        """Return the last computed statistic."""
+        return self._state
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of the sensor."""
+        unit = TEMP_FAHRENHEIT
+        if self._status.tempscale == self._client.TSCALE_C:
+            unit = TEMP_CELSIUS
+        if self._stat == TEMP_RATE:
+            return f"{unit}/h"
+        return unit
+
+    @property
+    def icon(self):
+        """Return the icon to use in the frontend."""
+        if self._stat == TEMP_RATE:
+            return "mdi:thermometer-chevron-up"
+        return "mdi:thermometer"
+
+
+class BalboaSpaTimeToTargetSensor(BalboaEntity):
+    """Representation of the time the spa needs to reach its set temperature.
+
+    The heating rate is learned from the spa's own heating periods and
+    stored per spa.  The estimate is only written when it moves by
+    TIME_TO_TARGET_STEP minutes or more.
+    """
+
+    def __init__(self, hass, entry, type):
+        """Initialize the sensor."""
+        super().__init__(hass, entry, type)
+        self._store = Store(
+            hass, STORAGE_VERSION, HEATING_STORAGE_KEY.format(entry.entry_id)
+        )
+        self._model = HeatingModel()
+        self._state = None
+
+    def _status_fields(self):
+        """Return the status fields this entity's state is built from."""
+        return (STATUS_CURTEMP, STATUS_SETTEMP, STATUS_HEATSTATE, STATUS_TEMPSCALE)
+
+    async def async_added_to_hass(self) -> None:
+        """Load the learned heating rate."""
+        await super().async_added_to_hass()
+        stored = await self._store.async_load()
+        if stored is not None:
+            self._model = HeatingModel(stored["rate"], stored["samples"])
+        self._state = self._estimate(self._status)
+
+    @callback
+    def _handle_update(self, status, changed) -> None:
+        """Learn from a status change and write the estimate if it moved."""
+        self._status = status
+        if self._watched.isdisjoint(changed):
+            return
+        if status.connected and self._model.observe(
+            time.monotonic(),
+            self._fahrenheit(status.curtemp),
+            status.heatstate == self._client.HEATSTATE_HEATING,
+        ):
+            self._store.async_delay_save(self._model.as_dict, HEATING_SAVE_DELAY)
+        estimate = self._estimate(status)
+        if (
+            STATUS_CONNECTED in changed
+            or (estimate is None) != (self._state is None)
+            or (estimate == 0) != (self._state == 0)
+            or (estimate and abs(estimate - self._state) >= TIME_TO_TARGET_STEP)
+        ):
+            self._state = estimate
+            self._publish()
+
+    def _fahrenheit(self, temp):
+        """Return a temperature from the spa in Fahrenheit, or None."""
+        if temp is None:
+            return None
+        if self._status.tempscale == self._client.TSCALE_C:
+            return temp * 1.8 + 32
+        return temp
+
+    def _estimate(self, status):
+        """Return the whole minutes to the set temperature, if known."""
+        minutes = self._model.minutes_to(
+            self._fahrenheit(status.curtemp), self._fahrenheit(status.settemp)
+        )
+        if minutes is None:
+            return None
+        return round(minutes)
+
+    @property
+    def state(self):
+        """Return the estimated minutes to the set temperature."""
+        return self._state
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of the sensor."""
+        return TIME_MINUTES
+
+    @property
+    def device_state_attributes(self):
+        """Return the learned heating rate."""
+        rate = self._model.rate
+        if rate is not None and self._status.tempscale == self._client.TSCALE_C:
+            rate /= 1.8
+        return {
+            "heating_rate": None if rate is None else round(rate, 2),
+            "samples": self._model.samples,
+        }
+
+    @property
+    def icon(self):
+        """Return the icon to use in the frontend."""
+        return "mdi:timer-sand"
@@ -0,0 +1,207 @@
+"""Background task supervision for a Balboa spa connection."""
+import asyncio
+import random
+import time
+from functools import partial
+
+from homeassistant.core import callback
+from pybalboa import balboa
+
+from .const import (
+    _LOGGER,
+    CONNECT_TIMEOUT,
+    RECONNECT_BACKOFF_MAX,
+    RECONNECT_BACKOFF_MIN,
+    STALE_TIMEOUT,
+    WATCHDOG_MIN_TIMEOUT,
+    WATCHDOG_MISSED_FRAMES,
+    WATCHDOG_SMOOTHING,
+)
+
+
+class SpaSupervisor:
+    """Own the long running tasks of one config entry.
+
+    Each task is registered under a name and at most one task runs per
+    name; starting a task again replaces the running one.  Everything is
+    cancelled when the entry is unloaded.
+
+    The connection is checked by async_check, which the integration calls
+    for every spa from one shared timer rather than each spa polling on its
+    own.  It also acts as a watchdog on the stream of frames: it learns how
+    often the spa sends them from the client's frame counter, and treats
+    the connection as lost once several intervals pass without one.  A
+    half-open socket never reports an error, so this is how a silent stall
+    is noticed.
+
+    Requests the spa answers with its configuration go through the command
+    queue, which runs as one of the tasks.
+    """
+
+    def __init__(self, hass, spa, commands):
+        """Initialize the supervisor."""
+        self.hass = hass
+        self.spa = spa
+        self.commands = commands
+        self.reconnects = 0
+        self._tasks = {}
+        self._attempt = 0
+        self._next_attempt = 0
+        self._was_connected = False
+        self.frame_interval = None
+        self._frames = 0
+        self._last_progress = 0
+        self._learn = False
+        self._stopped = False
+
+    def start_task(self, name, coro):
+        """Run coro as the only task named name, unless stopped."""
+        if self._stopped:
+            coro.close()
+            return None
+        self.cancel_task(name)
+        task = self.hass.loop.create_task(coro)
+        self._tasks[name] = task
+        task.add_done_callback(partial(self._task_done, name))
+        return task
+
+    def _task_done(self, name, task):
+        """Forget a finished task, unless it has already been replaced.
+
+        A task that failed is logged; the connection check starts the
+        listener and connection attempts again as needed.
+        """
+        if self._tasks.get(name) is task:
+            del self._tasks[name]
+        if not task.cancelled() and task.exception() is not None:
+            _LOGGER.error(
+                "Task %s of spa at %s failed",
+                name,
+                self.spa.host,
+                exc_info=task.exception(),
+            )
+
+    def cancel_task(self, name):
+        """Cancel the task named name, if it is running."""
+        task = self._tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+
+    def start(self):
+        """Start the command queue and listening, connecting first if needed."""
+        self.start_task("commands", self.commands.async_run())
+        if self.spa.connected:
+            self._was_connected = True
+            self._reset_watchdog()
+            self.start_task("listen", self.spa.listen())
+        else:
+            self.async_check()
+
+    async def async_stop(self):
+        """Cancel every task and wait for them to finish.
+
+        The supervisor starts no tasks after this.
+        """
+        self._stopped = True
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @callback
+    def async_check(self):
+        """Check the connection and start a reconnect if it is down.
+
+        Reconnect attempts back off exponentially, with jitter, so that many
+        spas dropping at once do not retry in lockstep.
+        """
+        spa = self.spa
+        if self._stopped or "connect" in self._tasks:
+            return
+        if spa.connected and spa.reader is not None and spa.reader.at_eof():
+            # pybalboa does not notice the spa closing the connection
+            _LOGGER.error("Spa at %s closed the connection", spa.host)
+            self._drop_connection()
+        elif spa.connected and self._stalled():
+            _LOGGER.error(
+                "Spa at %s sent nothing for %.1fs, reconnecting",
+                spa.host,
+                time.monotonic() - self._last_progress,
+            )
+            if not self._learn:
+                # Nothing at all since connecting, so back off as if the
+                # connection had failed
+                self._schedule_retry()
+            self._drop_connection()
+
+        if not spa.connected:
+            if time.monotonic() >= self._next_attempt:
+                self.start_task("connect", self._async_connect())
+        elif spa.lastupd and spa.lastupd + STALE_TIMEOUT < time.time():
+            _LOGGER.error("Spa stopped responding, requesting panel config.")
+            self.commands.async_query(balboa.BMTR_DEVICE_CONFIG_RESP, max_age=0)
+
+    def _drop_connection(self):
+        """Mark the spa disconnected and tell the entities."""
+        self.spa.connected = False
+        self.start_task("notify", self.spa.int_new_data_cb())
+
+    def _reset_watchdog(self):
+        """Start watching the frames of a new connection."""
+        self._frames = self.spa.frames
+        self._last_progress = time.monotonic()
+        # The first gap includes the connection setup, so is not learned from
+        self._learn = False
+
+    def _stalled(self):
+        """Learn from the frames read since the last check, return if stalled."""
+        now = time.monotonic()
+        frames = self.spa.frames
+        if frames != self._frames:
+            if self._learn:
+                interval = (now - self._last_progress) / (frames - self._frames)
+                if self.frame_interval is None:
+                    self.frame_interval = interval
+                else:
+                    self.frame_interval += WATCHDOG_SMOOTHING * (
+                        interval - self.frame_interval
+                    )
+            self._learn = True
+            self._attempt = 0
+            self._frames = frames
+            self._last_progress = now
+            return False
+        timeout = WATCHDOG_MIN_TIMEOUT
+        if self.frame_interval is not None:
+            timeout = max(timeout, WATCHDOG_MISSED_FRAMES * self.frame_interval)
+        return now - self._last_progress > timeout
+
+    def _schedule_retry(self):
+        """Delay the next connection attempt, backing off exponentially."""
+        delay = min(RECONNECT_BACKOFF_MAX, RECONNECT_BACKOFF_MIN * 2**self._attempt)
+        self._attempt += 1
+        self._next_attempt = time.monotonic() + delay * random.uniform(0.5, 1)
+
+    async def _async_connect(self):
+        """Connect to the spa, scheduling the next attempt if it fails."""
+        spa = self.spa
+        if spa.writer is not None:
+            spa.writer.close()
+        try:
+            # pybalboa leaves the timeout to the OS, which can take minutes
+            connected = await asyncio.wait_for(spa.connect(), CONNECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            connected = False
+        if not connected:
+            self._schedule_retry()
+            return
+        if self._was_connected:
+            self.reconnects += 1
+            _LOGGER.info("Reconnected to spa at %s", spa.host)
+        self._was_connected = True
+        self._reset_watchdog()
+        # Restart the listener, which only checks for a connection every 5s
+        self.start_task("listen", spa.listen())
+        self.commands.async_query(balboa.BMTR_MOD_IDENT_RESP, max_age=0)
+        self.commands.async_query(balboa.BMTR_DEVICE_CONFIG_RESP, max_age=0)
@@ -1,11 +1,34 @@
 """Support for Balboa Spa switches."""
+from functools import partial
+
 from homeassistant.components.switch import DEVICE_CLASS_SWITCH, SwitchEntity
 
 from . import BalboaEntity
-from .const import _LOGGER, AUX, DOMAIN, LIGHT, MISTER, SPA, TEMP_RANGE
+from .const import (
+    _LOGGER,
+    AUX,
+    DOMAIN,
+    LIGHT,
+    MISTER,
+    SPA,
+    STATUS_AUX,
+    STATUS_LIGHT,
+    STATUS_MISTER,
+    STATUS_TEMPRANGE,
+    TEMP_RANGE,
+)
 
-CHANGE_FUNCTION = "change"
-GET_FUNCTION = "get"
+# Status field, pybalboa change method and (off, on) icons of each switch type
+SWITCH_TYPES = {
+    AUX: (STATUS_AUX, "change_aux", ("mdi:flash", "mdi:flash")),
+    LIGHT: (STATUS_LIGHT, "change_light", ("mdi:lightbulb-off", "mdi:lightbulb")),
+    MISTER: (STATUS_MISTER, "change_mister", ("mdi:weather-fog", "mdi:weather-fog")),
+    TEMP_RANGE: (
+        STATUS_TEMPRANGE,
+        "change_temprange",
+        ("mdi:thermometer-minus", "mdi:thermometer-plus"),
+    ),
+}
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
@@ -23,39 +46,37 @@ async def async_setup_entry(hass, entry, async_add_entities):
     if spa.have_mister():
         devs.append(BalboaSpaSwitch(hass, entry, MISTER))
 
-    async_add_entities(devs, True)
+    async_add_entities(devs)
 
 
 class BalboaSpaSwitch(BalboaEntity, SwitchEntity):
     """Representation of a Balboa Spa switch device."""
 
-    @property
-    def type_functions(self):
-        """Get the appropriate function for the type of switch"""
-        return {
-            AUX: {
-                GET_FUNCTION: self._client.get_aux,
-                CHANGE_FUNCTION: self._client.change_aux,
-            },
-            LIGHT: {
-                GET_FUNCTION: self._client.get_light,
-                CHANGE_FUNCTION: self._client.change_light,
-            },
-            MISTER: {
-                GET_FUNCTION: self._client.get_mister,
-                CHANGE_FUNCTION: self._client.change_mister,
-            },
-            TEMP_RANGE: {
-                GET_FUNCTION: self._client.get_temprange,
-                CHANGE_FUNCTION: self._client.change_temprange,
-            },
-        }
+    def __init__(self, hass, entry, type, num=None):
+        """Initialize the switch and resolve its status field and methods."""
+        field, change, self._icons = SWITCH_TYPES[type]
+        self._field = field
+        self._key = f'{field}{num or ""}'
+        # Lights and aux are numbered items of an array field
+        self._index = num - 1 if num else None
+        self._change = getattr(hass.data[DOMAIN][entry.entry_id][SPA], change)
+        if self._index is not None:
+            self._change = partial(self._change, self._index)
+        super().__init__(hass, entry, type, num)
+
+    def _status_fields(self):
+        """Return the status fields this entity's state is built from."""
+        return (self._key,)
+
+    def _switch_state(self, status):
+        """Return the state of the switch in a spa status."""
+        state = getattr(status, self._field)
+        return state if self._index is None else state[self._index]
 
     @property
     def is_on(self) -> bool:
         """Return True if the switch is on."""
-        key = self._num - 1 if self._num else None
-        return self.type_functions[self._type][GET_FUNCTION](key)
+        return self._switch_state(self._status)
 
     @property
     def device_class(self):
@@ -65,14 +86,8 @@ class BalboaSpaSwitch(BalboaEntity, SwitchEntity):
     @property
     def icon(self):
         """Return the icon to use in the frontend, if any."""
-        if self._type == LIGHT:
-            return "mdi:lightbulb" if self.is_on else "mdi:lightbulb-off"
-        elif self._type == MISTER:
-            return "mdi:weather-fog"
-        elif self._type == TEMP_RANGE:
-            return "mdi:thermometer-plus" if self.is_on else "mdi:thermometer-minus"
-        else:
-            return "mdi:flash"
+        off, on = self._icons
+        return on if self.is_on else off
 
     async def async_turn_off(self, **kwargs):
         """Turn off the switch."""
@@ -89,7 +104,16 @@ class BalboaSpaSwitch(BalboaEntity, SwitchEntity):
         return await self.change_switch(new_state)
 
     async def change_switch(self, new_state=None):
-        key = self._num - 1 if self._num else None
-        return await self.type_functions[self._type][CHANGE_FUNCTION](
-            *[v for v in [key, new_state] if v is not None]
+        return await self._async_send_command(
+            self._key,
+            partial(self._change, new_state),
+            # aux states are reported as bit masks rather than 0 or 1
+            lambda status: bool(self._switch_state(status)) == bool(new_state),
+            overlay=lambda status: self._with_switch_state(status, new_state),
         )
+
+    def _with_switch_state(self, status, new_state):
+        """Return a copy of a spa status with the switch set to new_state."""
+        if self._index is not None:
+            return status.replace_item(self._field, self._index, new_state)
+        return status._replace(**{self._field: new_state})
@@ -0,0 +1,177 @@
+"""Microbenchmark the per-write cost of the entities' static attributes.
+
+Builds every real entity of the canned spa configuration used by
+bench_status, through the platforms' own setup, and reads the attributes
+that only change with the spa configuration: name, unique ID, device info,
+features, device class, temperature unit and limits, and the HVAC and fan
+modes.  Reading them as the entities cache them is compared with working
+them out on every read, with the property bodies the entities had before
+the cache, over the same entities.
+
+Run from the repository root with Home Assistant and pybalboa installed:
+
+    python -m tools.bench_metadata
+"""
+import argparse
+import asyncio
+import timeit
+
+from homeassistant.components.climate.const import (
+    HVAC_MODE_AUTO,
+    SUPPORT_FAN_MODE,
+    SUPPORT_PRESET_MODE,
+    SUPPORT_TARGET_TEMPERATURE,
+)
+from homeassistant.const import TEMP_CELSIUS, TEMP_FAHRENHEIT
+from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC
+
+from custom_components.balboa.climate import BalboaSpaClimate
+from custom_components.balboa.const import (
+    CLIMATE_SUPPORTED_FANSTATES,
+    CLIMATE_SUPPORTED_MODES,
+    DOMAIN,
+    PLATFORMS,
+)
+from tools.bench_status import async_build_entities, build_spa
+
+METADATA_PROPERTIES = (
+    "name",
+    "unique_id",
+    "device_info",
+    "supported_features",
+    "device_class",
+    "temperature_unit",
+    "min_temp",
+    "max_temp",
+    "hvac_modes",
+    "fan_modes",
+)
+
+
+class PerReadEntity:
+    """The static attributes of an entity as worked out before the cache."""
+
+    def __init__(self, entity):
+        """Take the spa, name, type and number of a real entity."""
+        self._client = entity._client
+        self._device_name = entity._device_name
+        self._type = entity._type
+        self._num = entity._num
+
+    @property
+    def name(self):
+        return f'{self._device_name}: {self._type}{self._num or ""}'
+
+    @property
+    def unique_id(self):
+        return f'{self._device_name}-{self._type}{self._num or ""}-{self._client.get_macaddr().replace(":","")[-6:]}'
+
+    @property
+    def device_info(self):
+        return {
+            "identifiers": {(DOMAIN, self._client.get_macaddr())},
+            "name": self._device_name,
+            "manufacturer": "Balboa Water Group",
+            "model": self._client.get_model_name(),
+            "sw_version": self._client.get_ssid(),
+            "connections": {(CONNECTION_NETWORK_MAC, self._client.get_macaddr())},
+        }
+
+
+class PerReadClimate(PerReadEntity):
+    """The static attributes of the climate entity before the cache."""
+
+    @property
+    def supported_features(self):
+        features = SUPPORT_TARGET_TEMPERATURE | SUPPORT_PRESET_MODE
+
+        if self._client.have_blower():
+            features |= SUPPORT_FAN_MODE
+
+        return features
+
+    @property
+    def hvac_modes(self):
+        if self._client.get_heatmode() == self._client.HEATMODE_RNR:
+            return [*CLIMATE_SUPPORTED_MODES, HVAC_MODE_AUTO]
+        else:
+            return CLIMATE_SUPPORTED_MODES
+
+    @property
+    def fan_modes(self):
+        return CLIMATE_SUPPORTED_FANSTATES
+
+    @property
+    def temperature_unit(self):
+        tscale = self._client.get_tempscale()
+        if tscale == self._client.TSCALE_C:
+            return TEMP_CELSIUS
+        return TEMP_FAHRENHEIT
+
+    @property
+    def min_temp(self):
+        trange = self._client.get_temprange()
+        scale = self._client.get_tempscale()
+        return self._client.tmin[trange][scale]
+
+    @property
+    def max_temp(self):
+        trange = self._client.get_temprange()
+        scale = self._client.get_tempscale()
+        return self._client.tmax[trange][scale]
+
+
+def per_read_reads(entities):
+    """Return the (object, attribute) reads of a write before the cache.
+
+    Attributes the entities never worked out per read, such as a constant
+    device class, are read from the real entity.
+    """
+    reads = []
+    for entity in entities:
+        cls = PerReadClimate if isinstance(entity, BalboaSpaClimate) else PerReadEntity
+        before = cls(entity)
+        reads += [
+            (before if hasattr(cls, name) else entity, name)
+            for name in METADATA_PROPERTIES
+        ]
+    return reads
+
+
+def read_all(reads):
+    """Write every entity once, reading each of its static attributes."""
+    for obj, name in reads:
+        getattr(obj, name, None)
+
+
+async def async_main(args, spa):
+    """Run the benchmark and print the cost per write of every entity."""
+    entities = [entity for _, entity in await async_build_entities(spa, PLATFORMS)]
+    for label, reads in (
+        ("computed", per_read_reads(entities)),
+        (
+            "cached",
+            [(entity, name) for entity in entities for name in METADATA_PROPERTIES],
+        ),
+    ):
+        elapsed = min(
+            timeit.repeat(lambda: read_all(reads), number=args.writes, repeat=5)
+        )
+        print(
+            f"{label}: {elapsed / args.writes * 1e6:.2f} us per write "
+            f"of all {len(entities)} entities"
+        )
+
+
+def main():
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=10000)
+    args = parser.parse_args()
+    # The canned spa is built in its own event loop
+    spa = build_spa()
+    asyncio.run(async_main(args, spa))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Microbenchmark the per-frame cost of reading spa state.
+
+Compares reading every entity's state through the pybalboa getters, as the
+entities did before the status snapshot existed, with building one
+SpaStatus per frame and reading its fields.
+
+Run from the repository root with Home Assistant and pybalboa installed:
+
+    python -m tools.bench_status
+"""
+import argparse
+import asyncio
+import importlib
+import timeit
+
+from homeassistant import config_entries, core
+from homeassistant.const import CONF_HOST, CONF_NAME
+from pybalboa import BalboaSpaWifi
+
+from custom_components.balboa import SpaStatus
+from custom_components.balboa.commands import CommandQueue
+from custom_components.balboa.const import (
+    COMMANDS,
+    DOMAIN,
+    PROFILER,
+    SPA,
+    STATUS,
+)
+from custom_components.balboa.profiler import Profiler
+
+# Device configuration with 3 two-speed pumps, 2 lights, 2 aux, blower,
+# mister and circulation pump, followed by a status update.
+CONFIG_FRAME = bytes.fromhex("7e0b0abf2e2a000583330d7e")
+STATUS_FRAME = bytes.fromhex(
+    "7e1dffaf1300006a0c1e0000010000000416028513000000006600000000007e"
+)
+
+
+def build_spa():
+    """Return a BalboaSpaWifi populated from the canned frames."""
+    spa = BalboaSpaWifi("localhost")
+    spa.parse_device_configuration(CONFIG_FRAME)
+    asyncio.run(spa.parse_status_update(STATUS_FRAME))
+    return spa
+
+
+async def async_build_entities(spa, platforms, spas=1):
+    """Return the (platform, entity) pairs the platforms set up for spa.
+
+    Each of the spas gets its own config entry sharing the canned spa, and
+    the entities are given entity IDs so that their state can be written.
+    Must be called from within the event loop.
+    """
+    hass = core.HomeAssistant()
+    hass.data[DOMAIN] = {}
+    entities = []
+    for num in range(spas):
+        entry = config_entries.ConfigEntry(
+            1,
+            DOMAIN,
+            f"Spa {num}",
+            {CONF_HOST: spa.host, CONF_NAME: f"Spa {num}"},
+            "user",
+        )
+        hass.data[DOMAIN][entry.entry_id] = {
+            SPA: spa,
+            COMMANDS: CommandQueue(hass, spa),
+            PROFILER: Profiler(),
+            STATUS: SpaStatus.from_spa(spa),
+        }
+        for platform in platforms:
+            module = importlib.import_module(f"custom_components.balboa.{platform}")
+            added = []
+            await module.async_setup_entry(hass, entry, added.extend)
+            for entity in added:
+                entity.entity_id = f"{platform}.spa_{num}_{len(entities)}"
+                entities.append((platform, entity))
+    return entities
+
+
+def read_getters(spa):
+    """Read all entity states the way the entities used to."""
+    # climate
+    spa.get_heatmode()
+    spa.get_heatmode()
+    spa.get_heatstate()
+    spa.get_blower()
+    spa.get_tempscale()
+    spa.get_curtemp()
+    spa.get_settemp()
+    spa.tmin[spa.get_temprange()][spa.get_tempscale()]
+    spa.tmax[spa.get_temprange()][spa.get_tempscale()]
+    [
+        mode
+        for mode in spa.get_heatmode_stringlist()
+        if spa.get_heatmode() == spa.HEATMODE_RNR
+        or mode != spa.get_heatmode_stringlist()[spa.HEATMODE_RNR]
+    ]
+    spa.get_heatmode(True)
+    # switches read the state twice, once for is_on and once for the icon
+    for num, value in enumerate(spa.light_array):
+        if value:
+            for _ in range(2):
+                {"get": spa.get_light, "change": spa.change_light}["get"](num)
+    for num, value in enumerate(spa.aux_array):
+        if value:
+            {"get": spa.get_aux, "change": spa.change_aux}["get"](num)
+    spa.get_mister()
+    spa.get_temprange()
+    spa.get_temprange()
+    # pumps
+    for num, value in enumerate(spa.pump_array):
+        if value:
+            spa.get_pump(num)
+            spa.get_pump(num)
+    # binary sensors
+    spa.get_filtermode()
+    spa.get_filtermode()
+    spa.get_circ_pump()
+
+
+def read_snapshot(spa):
+    """Build one snapshot and read all entity states from it."""
+    status = SpaStatus.from_spa(spa)
+    # climate
+    status.heatmode
+    status.heatmode
+    status.heatstate
+    status.blower
+    status.tempscale
+    status.curtemp
+    status.settemp
+    spa.tmin[status.temprange][status.tempscale]
+    spa.tmax[status.temprange][status.tempscale]
+    status.heatmode
+    status.heatmode
+    # switches
+    for num, value in enumerate(spa.light_array):
+        if value:
+            status.light[num]
+            status.light[num]
+    for num, value in enumerate(spa.aux_array):
+        if value:
+            status.aux[num]
+    status.mister
+    status.temprange
+    status.temprange
+    # pumps
+    for num, value in enumerate(spa.pump_array):
+        if value:
+            status.pump[num]
+            status.pump[num]
+    # binary sensors
+    status.filter_mode
+    status.filter_mode
+    status.circ_pump
+
+
+def main():
+    """Run the benchmark and print the cost per frame."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100000)
+    args = parser.parse_args()
+
+    spa = build_spa()
+    for func in (read_getters, read_snapshot):
+        elapsed = min(timeit.repeat(lambda: func(spa), number=args.frames, repeat=5))
+        print(f"{func.__name__}: {elapsed / args.frames * 1e6:.2f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Microbenchmark the per-frame cost of the switch and binary sensor states.
+
+Builds the real switches and binary sensors of a number of spas, through
+the platforms' own setup, with the canned configuration of bench_status,
+which has 2 lights and 2 aux outputs, the most a spa can have, plus a
+mister and a circulation pump.  Each frame hands every such entity a new
+status and either reads its state and icon, or writes its whole state the
+way it does when one of its fields changed.
+
+The entities as they are, reading through the status field and icons
+resolved when they were created, are compared with the same entities
+branching on their type on every read, as they did before.
+
+Run from the repository root with Home Assistant and pybalboa installed:
+
+    python -m tools.bench_switches
+"""
+import argparse
+import asyncio
+import timeit
+
+from custom_components.balboa import SpaStatus
+from custom_components.balboa.binary_sensor import BalboaSpaBinarySensor
+from custom_components.balboa.const import (
+    AUX,
+    CIRC_PUMP,
+    FILTER,
+    LIGHT,
+    MISTER,
+    TEMP_RANGE,
+)
+from custom_components.balboa.switch import BalboaSpaSwitch
+from tools.bench_status import async_build_entities, build_spa
+
+PLATFORMS = ["binary_sensor", "switch"]
+
+
+class BranchSwitch(BalboaSpaSwitch):
+    """A switch reading its state and icon the way it did before the tables."""
+
+    def _switch_state(self, status):
+        if self._type == LIGHT:
+            return status.light[self._num - 1]
+        if self._type == AUX:
+            return status.aux[self._num - 1]
+        if self._type == MISTER:
+            return status.mister
+        return status.temprange
+
+    @property
+    def is_on(self):
+        return self._switch_state(self._status)
+
+    @property
+    def icon(self):
+        if self._type == LIGHT:
+            return "mdi:lightbulb" if self.is_on else "mdi:lightbulb-off"
+        elif self._type == MISTER:
+            return "mdi:weather-fog"
+        elif self._type == TEMP_RANGE:
+            return "mdi:thermometer-plus" if self.is_on else "mdi:thermometer-minus"
+        else:
+            return "mdi:flash"
+
+
+class BranchBinarySensor(BalboaSpaBinarySensor):
+    """A binary sensor reading its state the way it did before the tables."""
+
+    @property
+    def is_on(self):
+        if self._type == CIRC_PUMP:
+            return self._status.circ_pump
+        if self._type == FILTER:
+            fmode = self._status.filter_mode
+            if fmode == self._client.FILTER_OFF:
+                return False
+            if self._num == 1 and fmode != self._client.FILTER_2:
+                return True
+            if self._num == 2 and fmode >= self._client.FILTER_2:
+                return True
+            return False
+        return False
+
+    @property
+    def icon(self):
+        if self._type == CIRC_PUMP:
+            return "mdi:water-pump" if self.is_on else "mdi:water-pump-off"
+        return "mdi:sync" if self.is_on else "mdi:sync-off"
+
+
+BRANCH_CLASSES = {"binary_sensor": BranchBinarySensor, "switch": BranchSwitch}
+
+
+def read_frame(entities, status):
+    """Take in a status and read the state and icon of every entity once."""
+    for entity in entities:
+        entity._status = status
+        entity.is_on
+        entity.icon
+
+
+def write_frame(entities, status, changed):
+    """Take in a status with changed fields and write every entity once."""
+    for entity in entities:
+        entity._handle_update(status, changed)
+
+
+async def async_main(args, spa):
+    """Run the benchmark and print the cost per frame."""
+    status = SpaStatus.from_spa(spa)
+    changed = frozenset(status._fields)
+    for spas in args.spas:
+        tables = await async_build_entities(spa, PLATFORMS, spas)
+        branches = await async_build_entities(spa, PLATFORMS, spas)
+        for platform, entity in branches:
+            # Set up as the real entity, then read the way it used to
+            entity.__class__ = BRANCH_CLASSES[platform]
+        for name, pairs in (("branches", branches), ("tables", tables)):
+            entities = [entity for _, entity in pairs]
+            for frame, func in (
+                ("read", lambda: read_frame(entities, status)),
+                ("write", lambda: write_frame(entities, status, changed)),
+            ):
+                elapsed = min(timeit.repeat(func, number=args.frames, repeat=5))
+                print(
+                    f"{spas} spas, {name}, {frame}: "
+                    f"{elapsed / args.frames * 1e6:.2f} us/frame "
+                    f"for {len(entities)} entities"
+                )
+
+
+def main():
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--spas", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+    # The canned spa is built in its own event loop
+    spa = build_spa()
+    asyncio.run(async_main(args, spa))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Benchmark the integration's frame-to-state path against simulated spas.
+
+For each combination of spa count and status frame rate, this starts that
+many simulated spas in a subprocess, sets them up through the config flow
+in a bare Home Assistant instance and measures:
+
+- setup time per config entry, until its entities have a state
+- frames read per second, across all spas
+- CPU microseconds spent in Home Assistant per frame read
+- state writes per frame read
+- latency from a frame arriving to the resulting state being written
+
+It then times, in isolation, one frame through the update callback and
+dispatcher fan-out (including the memory it allocates) and the property
+reads each platform entity makes per state write.
+
+Results are printed, or written with --output, as JSON so they can be
+compared between releases.  Run from the repository root with Home
+Assistant and pybalboa installed:
+
+    python -m tools.benchmark --spas 1 10 100 --rates 5 20 100
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from homeassistant import config_entries, core
+from homeassistant.const import CONF_HOST, CONF_NAME, EVENT_STATE_CHANGED
+from homeassistant.helpers import device_registry, entity_registry
+
+from custom_components.balboa.const import DOMAIN, PLATFORMS, SPA
+
+FIRST_HOST = "127.0.0.1"
+STARTUP_TIMEOUT = 60
+
+# Properties Home Assistant reads from an entity on every state write
+WRITE_PROPERTIES = (
+    "available",
+    "state",
+    "capability_attributes",
+    "state_attributes",
+    "device_state_attributes",
+    "unit_of_measurement",
+    "assumed_state",
+    "name",
+    "icon",
+    "device_class",
+    "supported_features",
+)
+
+
+def _host(num):
+    """Return the loopback address of simulated spa number num."""
+    return f"127.0.0.{num + 1}"
+
+
+def _percentiles(values):
+    """Return the 50th, 95th and 99th percentile of values, in milliseconds."""
+    if len(values) < 2:
+        return {"p50": None, "p95": None, "p99": None}
+    cuts = statistics.quantiles(values, n=100)
+    return {
+        "p50": round(cuts[49] * 1000, 3),
+        "p95": round(cuts[94] * 1000, 3),
+        "p99": round(cuts[98] * 1000, 3),
+    }
+
+
+class FrameStats:
+    """Frame arrival bookkeeping for one spa."""
+
+    def __init__(self, spa):
+        """Wrap the spa's reader to count and time stamp incoming frames."""
+        self.frames = 0
+        self.arrival = None
+        read_one_message = spa.read_one_message
+
+        async def _read_one_message():
+            data = await read_one_message()
+            if data is not None:
+                self.frames += 1
+                self.arrival = time.time()
+            return data
+
+        spa.read_one_message = _read_one_message
+
+
+async def async_start_hass(config_dir):
+    """Start a bare Home Assistant instance storing its data in config_dir."""
+    hass = core.HomeAssistant()
+    hass.config.config_dir = config_dir
+    hass.config.skip_pip = True
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    await asyncio.gather(
+        device_registry.async_load(hass), entity_registry.async_load(hass)
+    )
+    await hass.async_start()
+    return hass
+
+
+async def async_add_spa(hass, num):
+    """Add simulated spa number num through the config flow.
+
+    Returns the config entry and the seconds until all its entities had a
+    state.
+    """
+    start = time.perf_counter()
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": config_entries.SOURCE_USER},
+        data={CONF_HOST: _host(num), CONF_NAME: f"Spa {num}"},
+    )
+    entry = result["result"]
+    registry = await entity_registry.async_get_registry(hass)
+    while True:
+        entities = entity_registry.async_entries_for_config_entry(
+            registry, entry.entry_id
+        )
+        if entities and all(hass.states.get(e.entity_id) for e in entities):
+            return entry, time.perf_counter() - start
+        await asyncio.sleep(0.01)
+
+
+async def async_run_scenario(spas, rate, duration, warmup):
+    """Measure spas simulated spas streaming rate status frames per second."""
+    simulator = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "tools.spa_simulator",
+            "--host",
+            FIRST_HOST,
+            "--count",
+            str(spas),
+            "--rate",
+            str(rate),
+            "--vary",
+            "--blower",
+            "--lights",
+            "1,1",
+            "--aux",
+            "1,1",
+        ],
+        stderr=subprocess.DEVNULL,
+    )
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(config_dir)
+        try:
+            await asyncio.sleep(1)
+            setups = await asyncio.wait_for(
+                asyncio.gather(*(async_add_spa(hass, num) for num in range(spas))),
+                STARTUP_TIMEOUT + spas,
+            )
+            return await _async_measure(hass, setups, rate, duration, warmup)
+        finally:
+            await hass.async_stop()
+            simulator.terminate()
+            simulator.wait()
+
+
+async def _async_measure(hass, setups, rate, duration, warmup):
+    """Collect throughput and latency figures from running config entries."""
+    registry = await entity_registry.async_get_registry(hass)
+    stats = {}
+    entity_stats = {}
+    for entry, _ in setups:
+        frame_stats = FrameStats(hass.data[DOMAIN][entry.entry_id][SPA])
+        stats[entry.entry_id] = frame_stats
+        for entity in entity_registry.async_entries_for_config_entry(
+            registry, entry.entry_id
+        ):
+            entity_stats[entity.entity_id] = frame_stats
+
+    latencies = []
+    writes = 0
+
+    @core.callback
+    def _state_changed(event):
+        nonlocal writes
+        frame_stats = entity_stats.get(event.data["entity_id"])
+        if frame_stats is None or frame_stats.arrival is None:
+            return
+        writes += 1
+        latencies.append(event.time_fired.timestamp() - frame_stats.arrival)
+
+    await asyncio.sleep(warmup)
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _state_changed)
+    frames_before = sum(s.frames for s in stats.values())
+    cpu_before = time.process_time()
+    await asyncio.sleep(duration)
+    cpu = time.process_time() - cpu_before
+    frames = sum(s.frames for s in stats.values()) - frames_before
+    unsub()
+
+    setup_times = [seconds for _, seconds in setups]
+    return {
+        "spas": len(setups),
+        "rate": rate,
+        "setup_s": {
+            "mean": round(statistics.mean(setup_times), 3),
+            "max": round(max(setup_times), 3),
+        },
+        "frames_per_s": round(frames / duration, 1),
+        "cpu_us_per_frame": round(cpu / frames * 1e6, 1) if frames else None,
+        "state_writes_per_frame": round(writes / frames, 3) if frames else None,
+        "latency_ms": _percentiles(latencies),
+    }
+
+
+async def async_run_micro(iterations):
+    """Time the update callback fan-out and entity property reads."""
+    simulator = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "tools.spa_simulator",
+            "--host",
+            FIRST_HOST,
+            "--blower",
+            "--mister",
+            "--lights",
+            "1,1",
+            "--aux",
+            "1,1",
+        ],
+        stderr=subprocess.DEVNULL,
+    )
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(config_dir)
+        try:
+            await asyncio.sleep(1)
+            entry, _ = await asyncio.wait_for(async_add_spa(hass, 0), STARTUP_TIMEOUT)
+            spa = hass.data[DOMAIN][entry.entry_id][SPA]
+            # Stop the stream so only the frames driven below reach the entities
+            spa.new_data_cb, update_cb = None, spa.new_data_cb
+
+            async def _frame(num):
+                spa.curtemp = 90 + num % 10
+                spa.pump_status[0] = num % 3
+                await update_cb()
+
+            start = time.perf_counter()
+            for num in range(iterations):
+                await _frame(num)
+            fanout = time.perf_counter() - start
+
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            peaks = []
+            for num in range(min(iterations, 1000)):
+                await _frame(num)
+                peaks.append(tracemalloc.get_traced_memory()[1] - base)
+                tracemalloc.reset_peak()
+            tracemalloc.stop()
+
+            properties = {}
+            for domain in PLATFORMS:
+                for entity in hass.data[domain].entities:
+                    if entity.platform.config_entry is not entry:
+                        continue
+                    start = time.perf_counter()
+                    for _ in range(iterations):
+                        for name in WRITE_PROPERTIES:
+                            getattr(entity, name, None)
+                    properties[entity.entity_id] = round(
+                        (time.perf_counter() - start) / iterations * 1e6, 2
+                    )
+        finally:
+            await hass.async_stop()
+            simulator.terminate()
+            simulator.wait()
+
+    return {
+        "fanout_us_per_frame": round(fanout / iterations * 1e6, 2),
+        "fanout_peak_alloc_bytes_per_frame": round(statistics.mean(peaks)),
+        "property_reads_us_per_write": properties,
+    }
+
+
+def _manifest_version():
+    """Return the integration version from its manifest."""
+    with open("custom_components/balboa/manifest.json") as manifest:
+        return json.load(manifest)["version"]
+
+
+async def async_main(args):
+    """Run every benchmark and return the results."""
+    results = {
+        "version": _manifest_version(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "micro": await async_run_micro(args.iterations),
+        "scenarios": [],
+    }
+    for spas in args.spas:
+        for rate in args.rates:
+            results["scenarios"].append(
+                await async_run_scenario(spas, rate, args.duration, args.warmup)
+            )
+    return results
+
+
+def main():
+    """Parse the command line and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spas", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--rates", type=float, nargs="+", default=[5, 20, 100])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds")
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(async_main(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Check that per-spa CPU stays flat as the number of spas grows.
+
+Runs the benchmark scenario for increasing numbers of simulated spas at a
+fixed frame rate and reports the CPU Home Assistant spends per spa per
+second.  If the integration scales linearly with the number of config
+entries, that figure should stay about the same from the smallest to the
+largest run; the check fails if it grows by more than --max-growth.  Run
+from the repository root with Home Assistant and pybalboa installed:
+
+    python -m tools.loadtest --spas 1 10 50 100
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from tools.benchmark import async_run_scenario
+
+
+async def async_main(args):
+    """Run the load steps and return the results."""
+    steps = []
+    for spas in args.spas:
+        scenario = await async_run_scenario(spas, args.rate, args.duration, args.warmup)
+        cpu_us = scenario["cpu_us_per_frame"] or 0
+        scenario["cpu_ms_per_spa_per_s"] = round(
+            cpu_us * scenario["frames_per_s"] / spas / 1000, 3
+        )
+        steps.append(scenario)
+        print(
+            f"{spas} spas: {scenario['cpu_ms_per_spa_per_s']} ms CPU per spa "
+            f"per second, {scenario['frames_per_s']} frames/s",
+            file=sys.stderr,
+        )
+
+    first = steps[0]["cpu_ms_per_spa_per_s"]
+    last = steps[-1]["cpu_ms_per_spa_per_s"]
+    growth = round(last / first, 2) if first else None
+    return {
+        "rate": args.rate,
+        "steps": steps,
+        "growth": growth,
+        "flat": growth is not None and growth <= args.max_growth,
+    }
+
+
+def main():
+    """Parse the command line and run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spas", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--rate", type=float, default=5)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds")
+    parser.add_argument(
+        "--max-growth",
+        type=float,
+        default=1.5,
+        help="largest allowed ratio of per-spa CPU between the last and first step",
+    )
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(async_main(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    sys.exit(0 if results["flat"] else 1)
+
+
+if __name__ == "__main__":
+    main()
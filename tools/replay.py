@@ -0,0 +1,185 @@
+"""Replay a frame recording made with the integration's record_frames option.
+
+By default the recorded frames are fed, as fast as they can be processed,
+through pybalboa's parsers and the integration's status snapshot and change
+detection, the same path a live frame takes up to the dispatcher.  Each
+status change is printed with its offset into the recording, followed by a
+summary of how fast the frames were processed:
+
+    python -m tools.replay balboa_<entry id>.frames
+
+With --serve, the recording is instead served to Home Assistant (or
+pybalboa) as a fake spa on a local TCP port, --speed times faster than it
+was recorded.  Configuration requests are answered from the recording where
+it has the responses, and by the spa simulator otherwise:
+
+    python -m tools.replay balboa_<entry id>.frames --serve --speed 4
+
+pybalboa pauses 0.1s after every frame it reads, so a live connection
+cannot take frames faster than about 10 per second.  Run from the
+repository root with Home Assistant and pybalboa installed.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+
+from pybalboa import balboa
+
+from custom_components.balboa import SpaStatus
+from custom_components.balboa.client import BalboaSpaClient
+from custom_components.balboa.recorder import read_frames
+from tools.spa_simulator import (
+    MT_DEVICE_CONFIG_RESP,
+    MT_FILTER_INFO_RESP,
+    MT_MOD_IDENT_REQ,
+    MT_MOD_IDENT_RESP,
+    MT_PANEL_REQ,
+    MT_SETUP_PARAMS_RESP,
+    MT_STATUS_UPDATE,
+    MT_SYS_INFO_RESP,
+    SpaSimulator,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# pybalboa parser for each configuration response, as in BalboaSpaWifi.listen
+PARSERS = {
+    balboa.BMTR_MOD_IDENT_RESP: "parse_module_identification",
+    balboa.BMTR_DEVICE_CONFIG_RESP: "parse_device_configuration",
+    balboa.BMTR_SYS_INFO_RESP: "parse_system_information",
+    balboa.BMTR_SETUP_PARAMS_RESP: "parse_setup_parameters",
+    balboa.BMTR_FILTER_INFO_RESP: "parse_filter_cycle_info",
+}
+
+# Response message type for each panel request page
+PANEL_RESPONSES = {
+    (0, 1): MT_DEVICE_CONFIG_RESP,
+    (1, 0): MT_FILTER_INFO_RESP,
+    (2, 0): MT_SYS_INFO_RESP,
+    (4, 0): MT_SETUP_PARAMS_RESP,
+}
+
+
+async def async_decode(frames):
+    """Run frames through the update path and print each status change."""
+    spa = BalboaSpaClient("replay")
+    previous = SpaStatus.from_spa(spa)
+    first = frames[0][0] if frames else 0
+    offset = 0
+    changes = 0
+
+    async def _update():
+        nonlocal previous, changes
+        status = SpaStatus.from_spa(spa)
+        changed = status.changed_fields(previous)
+        if changed:
+            changes += 1
+            print(f"{offset - first:10.3f}  {', '.join(sorted(changed))}")
+        previous = status
+
+    spa.new_data_cb = _update
+    unknown = 0
+    start = time.perf_counter()
+    for offset, frame in frames:
+        mtype = spa.find_balboa_mtype(frame)
+        if mtype == balboa.BMTR_STATUS_UPDATE:
+            await spa.parse_status_update(frame)
+        elif mtype in PARSERS:
+            getattr(spa, PARSERS[mtype])(frame)
+        else:
+            unknown += 1
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{len(frames)} frames ({unknown} unknown) over "
+        f"{frames[-1][0] - first if frames else 0:.1f}s recorded, "
+        f"{changes} status changes, replayed in {elapsed:.3f}s "
+        f"({len(frames) / elapsed if elapsed else 0:.0f} frames/s)",
+        file=sys.stderr,
+    )
+
+
+class ReplaySimulator(SpaSimulator):
+    """A fake spa that sends recorded frames instead of simulated ones."""
+
+    def __init__(self, frames, speed, **kwargs):
+        """Initialize the simulator with the recording to serve."""
+        super().__init__(**kwargs)
+        self.frames = frames
+        self.speed = speed
+        self.responses = {}
+        for _, frame in frames:
+            mtype = tuple(frame[2:5])
+            if mtype != MT_STATUS_UPDATE:
+                self.responses[mtype] = frame
+
+    def handle_message(self, message):
+        """Answer configuration requests, from the recording if possible."""
+        mtype, data = tuple(message[2:5]), message[5:-2]
+        self.commands.append(message)
+        if mtype == MT_MOD_IDENT_REQ:
+            response = MT_MOD_IDENT_RESP
+        elif mtype == MT_PANEL_REQ and len(data) >= 3:
+            response = PANEL_RESPONSES.get((data[0], data[2]))
+        else:
+            # The recording decides the spa's state, so commands are ignored
+            return []
+        if response in self.responses:
+            return [self.responses[response]]
+        return super().handle_message(message)
+
+    async def _stream(self, writer):
+        """Send the recorded frames with their recorded spacing."""
+        previous = None
+        try:
+            for timestamp, frame in self.frames:
+                if previous is not None:
+                    await asyncio.sleep((timestamp - previous) / self.speed)
+                previous = timestamp
+                await self._resume.wait()
+                writer.write(frame)
+                self.frames_sent += 1
+                await writer.drain()
+        except ConnectionError:
+            writer.close()
+            return
+        _LOGGER.info("Sent all %d recorded frames", self.frames_sent)
+
+
+async def async_serve(frames, args):
+    """Serve the recording until interrupted."""
+    simulator = ReplaySimulator(frames, args.speed, host=args.host, port=args.port)
+    await simulator.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+def main():
+    """Parse the command line and replay the recording."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording")
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=balboa.BALBOA_DEFAULT_PORT)
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="multiple of the recorded pace"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    frames = list(read_frames(args.recording))
+    try:
+        if args.serve:
+            asyncio.run(async_serve(frames, args))
+        else:
+            asyncio.run(async_decode(frames))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+"""Simulate a Balboa bwa Wi-Fi module on a local TCP port.
+
+The simulator speaks the same protocol pybalboa's BalboaSpaWifi expects: it
+answers module identification and panel requests, streams status updates
+at a configurable rate, acts on control commands and can inject faults
+(dropped connections, stalls and malformed frames).
+
+Run from the repository root:
+
+    python -m tools.spa_simulator --port 4257 --rate 5
+
+and point the integration (or pybalboa) at 127.0.0.1.  With --count N, N
+spas listen on consecutive loopback addresses starting at --host.  With
+--discovery-port, each spa also answers discovery requests on that UDP
+port, like the module does on port 30303.
+"""
+import argparse
+import asyncio
+import ipaddress
+import logging
+import random
+
+_LOGGER = logging.getLogger(__name__)
+
+BALBOA_DEFAULT_PORT = 4257
+DISCOVERY_PORT = 30303
+DISCOVERY_NAME = b"BWGSPA"
+M_STARTEND = 0x7E
+
+MT_STATUS_UPDATE = (0xFF, 0xAF, 0x13)
+MT_FILTER_INFO_RESP = (0x0A, 0xBF, 0x23)
+MT_MOD_IDENT_REQ = (0x0A, 0xBF, 0x04)
+MT_MOD_IDENT_RESP = (0x0A, 0xBF, 0x94)
+MT_CONTROL_REQ = (0x0A, 0xBF, 0x11)
+MT_SET_TEMP = (0x0A, 0xBF, 0x20)
+MT_SET_TIME = (0x0A, 0xBF, 0x21)
+MT_PANEL_REQ = (0x0A, 0xBF, 0x22)
+MT_SET_TSCALE = (0x0A, 0xBF, 0x27)
+MT_DEVICE_CONFIG_RESP = (0x0A, 0xBF, 0x2E)
+MT_SYS_INFO_RESP = (0x0A, 0xBF, 0x24)
+MT_SETUP_PARAMS_RESP = (0x0A, 0xBF, 0x25)
+
+C_PUMP1 = 0x04
+C_LIGHT1 = 0x11
+C_LIGHT2 = 0x12
+C_MISTER = 0x0E
+C_AUX1 = 0x16
+C_AUX2 = 0x17
+C_BLOWER = 0x0C
+C_TEMPRANGE = 0x50
+C_HEATMODE = 0x51
+
+HEATMODE_READY = 0
+HEATMODE_REST = 1
+HEATMODE_RNR = 2
+
+# System information around the model name: software version before it;
+# setup, configuration signature, voltage, heater type and dip switches after
+SYS_INFO_VERSION = bytes.fromhex("64dc1400")
+SYS_INFO_SETUP = bytes.fromhex("0451800c6b010a0200")
+
+# Temperature ranges as [low, high] in Fahrenheit, like the setup parameters
+TEMP_RANGES = ((50, 99), (80, 104))
+
+
+def calc_checksum(data):
+    """Return the Balboa CRC-8 of data."""
+    crc = 0xB5
+    for byte in data:
+        for i in range(8):
+            bit = crc & 0x80
+            crc = ((crc << 1) & 0xFF) | ((byte >> (7 - i)) & 0x01)
+            if bit:
+                crc ^= 0x07
+    for i in range(8):
+        bit = crc & 0x80
+        crc = (crc << 1) & 0xFF
+        if bit:
+            crc ^= 0x07
+    return crc ^ 0x02
+
+
+def build_message(mtype, payload=b""):
+    """Frame a message type and payload with length, checksum and delimiters."""
+    body = bytes((len(mtype) + len(payload) + 2, *mtype)) + bytes(payload)
+    return bytes((M_STARTEND,)) + body + bytes((calc_checksum(body), M_STARTEND))
+
+
+class SpaSimulator:
+    """A fake spa Wi-Fi module serving any number of TCP clients."""
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=BALBOA_DEFAULT_PORT,
+        rate=5.0,
+        macaddr="00:15:27:00:00:01",
+        model="BP2000G1",
+        pumps=(2, 2, 0, 0, 0, 0),
+        lights=(1, 0),
+        aux=(0, 0),
+        blower=False,
+        mister=False,
+        circ_pump=True,
+        celsius=False,
+        vary=False,
+        discovery_port=None,
+    ):
+        """Initialize the simulator with the spa's equipment and settings."""
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.macaddr = bytes.fromhex(macaddr.replace(":", ""))
+        self.model = model.encode("ascii")[:8].ljust(8)
+        self.pump_array = list(pumps)
+        self.light_array = list(lights)
+        self.aux_array = list(aux)
+        self.blower = blower
+        self.mister = mister
+        self.circ_pump = circ_pump
+        self.vary = vary
+        self.discovery_port = discovery_port
+
+        self.tempscale = 1 if celsius else 0
+        self.timescale = 1
+        self.curtemp = 100
+        self.settemp = 102
+        self.heatmode = HEATMODE_READY
+        self.temprange = 1
+        self.filter_mode = 1
+        self.time_hour = 12
+        self.time_minute = 0
+        self.pump_status = [0] * 6
+        self.light_status = [0, 0]
+        self.aux_status = [0, 0]
+        self.blower_status = 0
+        self.mister_status = 0
+
+        self.frames_sent = 0
+        self.commands = []
+        self._sequence = 0
+        self._server = None
+        self._discovery = None
+        self._clients = {}
+        self._resume = asyncio.Event()
+        self._resume.set()
+
+    @property
+    def heatstate(self):
+        """Return 1 while the heater is running."""
+        return int(self.heatmode == HEATMODE_READY and self.curtemp < self.settemp)
+
+    async def start(self):
+        """Start listening; port 0 picks a free port."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        _LOGGER.info("Spa simulator listening on %s:%d", self.host, self.port)
+        if self.discovery_port is not None:
+            (
+                self._discovery,
+                _,
+            ) = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: _DiscoveryResponder(self),
+                local_addr=(self.host, self.discovery_port),
+            )
+            self.discovery_port = self._discovery.get_extra_info("sockname")[1]
+
+    async def stop(self):
+        """Close all client connections and stop listening."""
+        self.disconnect()
+        if self._discovery is not None:
+            self._discovery.close()
+            self._discovery = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def disconnect(self):
+        """Drop every connected client, like a module reboot."""
+        for writer in list(self._clients):
+            writer.close()
+
+    def stall(self, seconds):
+        """Stop sending anything for a while, leaving sockets open."""
+        self._resume.clear()
+        asyncio.get_running_loop().call_later(seconds, self._resume.set)
+
+    def send_malformed(self, count=1):
+        """Send frames with bad checksums and stray bytes to every client."""
+        status = bytearray(self.status_message())
+        status[-2] ^= 0xFF
+        for writer in self._clients:
+            for _ in range(count):
+                writer.write(bytes(status))
+                writer.write(bytes(random.randrange(256) for _ in range(7)))
+
+    def status_message(self):
+        """Return a status update frame for the current state."""
+        curtemp = self.curtemp
+        if self.vary:
+            curtemp += self._sequence % 40
+            self._sequence += 1
+        data = bytearray(24)
+        scale = 2 if self.tempscale else 1
+        data[2] = int(curtemp * scale)
+        data[3] = self.time_hour
+        data[4] = self.time_minute
+        data[5] = self.heatmode
+        data[9] = self.tempscale | self.timescale << 1 | self.filter_mode << 2
+        data[10] = self.heatstate << 4 | self.temprange << 2
+        for num, state in enumerate(self.pump_status):
+            if num < 4:
+                data[11] |= state << num * 2
+            else:
+                data[12] |= state << (num - 4) * 2
+        data[13] = (0x02 if self.circ_pump else 0) | self.blower_status << 2
+        for num, state in enumerate(self.light_status):
+            data[14] |= (state << 1) << num * 2
+        data[15] = self.mister_status
+        for num, state in enumerate(self.aux_status):
+            if state:
+                data[15] |= 0x08 << num
+        data[20] = int(self.settemp * scale)
+        return build_message(MT_STATUS_UPDATE, data)
+
+    def mod_ident_message(self):
+        """Return a module identification response."""
+        idigi = bytes(8) + self.macaddr[:3] + b"\xff\xff" + self.macaddr[3:]
+        payload = b"\x02\x14\x80" + self.macaddr + idigi
+        return build_message(MT_MOD_IDENT_RESP, payload)
+
+    def device_config_message(self):
+        """Return a device configuration response describing the equipment."""
+        pumps = self.pump_array
+        payload = bytes(
+            (
+                pumps[0] | pumps[1] << 2 | pumps[2] << 4 | pumps[3] << 6,
+                pumps[4] | pumps[5] << 6,
+                self.light_array[0] | self.light_array[1] << 2,
+                (0x80 if self.circ_pump else 0) | (0x01 if self.blower else 0),
+                (0x30 if self.mister else 0)
+                | (0x01 if self.aux_array[0] else 0)
+                | (0x02 if self.aux_array[1] else 0),
+                0,
+            )
+        )
+        return build_message(MT_DEVICE_CONFIG_RESP, payload)
+
+    def sys_info_message(self):
+        """Return a system information response."""
+        payload = SYS_INFO_VERSION + self.model + SYS_INFO_SETUP
+        return build_message(MT_SYS_INFO_RESP, payload)
+
+    def setup_params_message(self):
+        """Return a setup parameters response with the temperature ranges."""
+        pump_bits = sum(1 << num for num, pump in enumerate(self.pump_array) if pump)
+        payload = bytes(
+            (0x04, 0x03, *TEMP_RANGES[0], *TEMP_RANGES[1], 0xE9, pump_bits, 0x45)
+        )
+        return build_message(MT_SETUP_PARAMS_RESP, payload)
+
+    def filter_info_message(self):
+        """Return a filter cycle response."""
+        return build_message(MT_FILTER_INFO_RESP, b"\x14\x00\x02\x00\x88\x00\x01\x00")
+
+    def handle_message(self, message):
+        """Act on a message from a client and return any response frames."""
+        mtype, data = tuple(message[2:5]), message[5:-2]
+        self.commands.append(message)
+        if mtype == MT_MOD_IDENT_REQ:
+            return [self.mod_ident_message()]
+        if mtype == MT_PANEL_REQ:
+            page = (data[0], data[2]) if len(data) >= 3 else None
+            response = {
+                (0, 1): self.device_config_message,
+                (1, 0): self.filter_info_message,
+                (2, 0): self.sys_info_message,
+                (4, 0): self.setup_params_message,
+            }.get(page)
+            return [response()] if response else []
+        if mtype == MT_CONTROL_REQ and data:
+            self._toggle(data[0])
+        elif mtype == MT_SET_TEMP and data:
+            self.settemp = data[0] / 2 if self.tempscale else data[0]
+        elif mtype == MT_SET_TIME and len(data) >= 2:
+            self.timescale = data[0] >> 7
+            self.time_hour = data[0] & 0x7F
+            self.time_minute = data[1]
+        elif mtype == MT_SET_TSCALE and len(data) >= 2:
+            self.tempscale = data[1]
+        else:
+            _LOGGER.debug("Ignoring message %s", message.hex())
+        return [self.status_message()]
+
+    def _toggle(self, item):
+        """Press a button on the panel."""
+        if C_PUMP1 <= item < C_PUMP1 + 6:
+            num = item - C_PUMP1
+            if self.pump_array[num]:
+                self.pump_status[num] = (self.pump_status[num] + 1) % (
+                    self.pump_array[num] + 1
+                )
+        elif item in (C_LIGHT1, C_LIGHT2):
+            num = item - C_LIGHT1
+            if self.light_array[num]:
+                self.light_status[num] ^= 1
+        elif item in (C_AUX1, C_AUX2):
+            num = item - C_AUX1
+            if self.aux_array[num]:
+                self.aux_status[num] ^= 1
+        elif item == C_MISTER and self.mister:
+            self.mister_status ^= 1
+        elif item == C_BLOWER and self.blower:
+            self.blower_status = (self.blower_status + 1) % 4
+        elif item == C_TEMPRANGE:
+            self.temprange ^= 1
+        elif item == C_HEATMODE:
+            if self.heatmode == HEATMODE_READY:
+                self.heatmode = HEATMODE_REST
+            elif self.heatmode == HEATMODE_REST:
+                self.heatmode = HEATMODE_READY
+            else:
+                self.heatmode = HEATMODE_REST
+
+    async def _handle(self, reader, writer):
+        """Serve one client connection."""
+        self._clients[writer] = asyncio.create_task(self._stream(writer))
+        try:
+            while True:
+                message = await self._read_message(reader)
+                if message is None:
+                    break
+                await self._resume.wait()
+                for response in self.handle_message(message):
+                    writer.write(response)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.pop(writer).cancel()
+            writer.close()
+
+    @staticmethod
+    async def _read_message(reader):
+        """Read one framed message, skipping anything between frames."""
+        while True:
+            start = await reader.read(1)
+            if not start:
+                return None
+            if start[0] != M_STARTEND:
+                continue
+            length = await reader.readexactly(1)
+            rest = await reader.readexactly(length[0])
+            message = start + length + rest
+            if calc_checksum(message[1:-2]) != message[-2]:
+                _LOGGER.warning("Discarding message with bad checksum")
+                continue
+            return message
+
+    async def _stream(self, writer):
+        """Send status updates to a client at the configured rate."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        try:
+            while not writer.is_closing():
+                await self._resume.wait()
+                writer.write(self.status_message())
+                self.frames_sent += 1
+                await writer.drain()
+                deadline = max(deadline + 1 / self.rate, loop.time())
+                await asyncio.sleep(deadline - loop.time())
+        except ConnectionError:
+            writer.close()
+
+
+class _DiscoveryResponder(asyncio.DatagramProtocol):
+    """Answer discovery requests with the simulated module's name and MAC."""
+
+    def __init__(self, simulator):
+        """Initialize the responder for simulator."""
+        self.simulator = simulator
+        self.transport = None
+
+    def connection_made(self, transport):
+        """Keep the transport to answer on."""
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        """Answer any request, as the module does."""
+        macaddr = self.simulator.macaddr.hex("-").upper().encode("ascii")
+        self.transport.sendto(DISCOVERY_NAME + b"\r\n" + macaddr + b"\r\n", addr)
+
+
+async def _run_faults(spas, args):
+    """Inject the faults requested on the command line, forever."""
+    loop = asyncio.get_running_loop()
+    schedule = {}
+    if args.disconnect_every:
+        schedule["disconnect"] = loop.time() + args.disconnect_every
+    if args.stall_every:
+        schedule["stall"] = loop.time() + args.stall_every
+    if args.malformed_every:
+        schedule["malformed"] = loop.time() + args.malformed_every
+    while True:
+        await asyncio.sleep(0.1)
+        now = loop.time()
+        for fault, when in schedule.items():
+            if when > now:
+                continue
+            _LOGGER.info("Injecting %s", fault)
+            for spa in spas:
+                if fault == "disconnect":
+                    spa.disconnect()
+                elif fault == "stall":
+                    spa.stall(args.stall_duration)
+                else:
+                    spa.send_malformed()
+            schedule[fault] = now + getattr(args, f"{fault}_every")
+
+
+def _parse_args():
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=BALBOA_DEFAULT_PORT)
+    parser.add_argument("--count", type=int, default=1, help="number of spas")
+    parser.add_argument(
+        "--discovery-port",
+        type=int,
+        nargs="?",
+        const=DISCOVERY_PORT,
+        help="answer discovery requests on this UDP port",
+    )
+    parser.add_argument("--rate", type=float, default=5.0, help="status frames/s")
+    parser.add_argument("--pumps", default="2,2,0,0,0,0", help="speeds per pump")
+    parser.add_argument("--lights", default="1,0")
+    parser.add_argument("--aux", default="0,0")
+    parser.add_argument("--blower", action="store_true")
+    parser.add_argument("--mister", action="store_true")
+    parser.add_argument("--celsius", action="store_true")
+    parser.add_argument(
+        "--vary", action="store_true", help="change the temperature every frame"
+    )
+    parser.add_argument("--disconnect-every", type=float, metavar="SECONDS")
+    parser.add_argument("--stall-every", type=float, metavar="SECONDS")
+    parser.add_argument("--stall-duration", type=float, default=30.0)
+    parser.add_argument("--malformed-every", type=float, metavar="SECONDS")
+    parser.add_argument("--debug", action="store_true")
+    return parser.parse_args()
+
+
+async def _main(args):
+    """Run the simulators until interrupted."""
+    first_host = ipaddress.ip_address(args.host)
+    spas = [
+        SpaSimulator(
+            host=str(first_host + num),
+            port=args.port,
+            rate=args.rate,
+            macaddr=f"00:15:27:00:{num >> 8:02x}:{num & 0xFF:02x}",
+            pumps=[int(value) for value in args.pumps.split(",")],
+            lights=[int(value) for value in args.lights.split(",")],
+            aux=[int(value) for value in args.aux.split(",")],
+            blower=args.blower,
+            mister=args.mister,
+            celsius=args.celsius,
+            vary=args.vary,
+            discovery_port=args.discovery_port,
+        )
+        for num in range(args.count)
+    ]
+    await asyncio.gather(*(spa.start() for spa in spas))
+    try:
+        await _run_faults(spas, args)
+    finally:
+        await asyncio.gather(*(spa.stop() for spa in spas))
+
+
+if __name__ == "__main__":
+    ARGS = _parse_args()
+    logging.basicConfig(level=logging.DEBUG if ARGS.debug else logging.INFO)
+    try:
+        asyncio.run(_main(ARGS))
+    except KeyboardInterrupt:
+        pass